@@ -3,7 +3,17 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from models import db
+from sqlalchemy import text
+from cache import cache
+import serializers
+import middleware
+import dbpool
+import metrics
+import querylog
+from replicas import replicas, use_primary
 from config import config
+from search import rebuild_index, include_in_migrations
+import click
 import os
 
 # Import blueprints
@@ -11,6 +21,8 @@ from auth import auth_bp
 from products import products_bp
 from cart import cart_bp
 from checkout import checkout_bp
+from catalog_import import catalog_import_bp
+from order_export import order_export_bp
 
 def create_app(config_name='default'):
     app = Flask(__name__)
@@ -19,9 +31,18 @@ def create_app(config_name='default'):
     app.config.from_object(config[config_name])
     
     # Initialize extensions
+    dbpool.init_app(app)
     db.init_app(app)
+    # First, so its after_request hook runs last and records the final
+    # status (e.g. 304) and the time spent compressing
+    metrics.init_app(app)
+    replicas.init_app(app)
+    cache.init_app(app)
+    serializers.init_app(app)
+    middleware.init_app(app)
+    querylog.init_app(app)
     jwt = JWTManager(app)
-    migrate = Migrate(app, db)
+    migrate = Migrate(app, db, include_object=include_in_migrations)
     
     # Configure CORS
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
@@ -31,6 +52,8 @@ def create_app(config_name='default'):
     app.register_blueprint(products_bp)
     app.register_blueprint(cart_bp)
     app.register_blueprint(checkout_bp)
+    app.register_blueprint(catalog_import_bp)
+    app.register_blueprint(order_export_bp)
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -41,6 +64,57 @@ def create_app(config_name='default'):
             'environment': config_name
         }), 200
     
+    # Readiness check with connection pool statistics
+    @app.route('/api/health/db', methods=['GET'])
+    @use_primary
+    def database_health_check():
+        try:
+            db.session.execute(text('SELECT 1'))
+            status, code = 'healthy', 200
+        except Exception:
+            # Details (DSN, driver errors) go to the log, not the response
+            app.logger.exception('Database health check failed')
+            db.session.rollback()
+            status, code = 'unhealthy', 503
+        
+        return jsonify({
+            'status': status,
+            'pool': dbpool.pool_stats(db.engine),
+            'replicas': [dbpool.pool_stats(engine) for engine in replicas.engines]
+        }), code
+    
+    # CLI commands
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        rebuild_index()
+        print('Search index rebuilt')
+    
+    @app.cli.command('import-products')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option('--format', 'feed_format', type=click.Choice(['csv', 'ndjson']), help='Default: from the file extension')
+    @click.option('--batch-size', type=int, default=None, help='Rows per batch (default IMPORT_BATCH_SIZE)')
+    def import_products_command(path, feed_format, batch_size):
+        from catalog_import import import_file, ImportFormatError
+        try:
+            report = import_file(path, feed_format, batch_size)
+        except ImportFormatError as e:
+            raise click.UsageError(str(e))
+        
+        print(f"Imported {report.imported} of {report.processed} rows ({report.failed} failed)")
+        for error in report.errors:
+            print(f"  line {error['line']}: {error['error']}")
+    
+    @app.cli.command('checkout-worker')
+    @click.option('--workers', type=int, default=None, help='Worker threads (default CHECKOUT_WORKERS)')
+    def checkout_worker(workers):
+        from checkout_queue import run_workers
+        # Orders placed here must invalidate the web workers' cached stock
+        if cache.process_local:
+            raise click.UsageError(
+                'The checkout worker needs a shared cache: set CACHE_BACKEND=redis or CACHE_ENABLED=false'
+            )
+        run_workers(app, workers)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
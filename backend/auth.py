@@ -1,11 +1,35 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from sqlalchemy.exc import IntegrityError
 from models import db, User
+from passwords import needs_rehash, HashingBusy
+from cache import LRUCache, MISSING
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
 
+# Serialized users keyed by id, per process. update_profile invalidates the
+# local entry; other processes may serve the old profile until the TTL ends.
+principal_cache = LRUCache()
+
+@auth_bp.record_once
+def configure_principal_cache(state):
+    principal_cache.maxsize = state.app.config['PRINCIPAL_CACHE_MAXSIZE']
+    principal_cache.ttl = state.app.config['PRINCIPAL_CACHE_TTL']
+
+def hashing_busy():
+    # Every password hashing slot stayed taken (see passwords.py)
+    db.session.rollback()
+    return jsonify({'error': 'Too many sign-ins right now, please try again'}), 503, {'Retry-After': '1'}
+
+def issue_access_token(user):
+    # Optionally embed the (non-sensitive) profile so /me can skip the database
+    additional_claims = None
+    if current_app.config['JWT_PROFILE_CLAIMS']:
+        additional_claims = {'profile': user.to_dict()}
+    
+    return create_access_token(identity=str(user.id), additional_claims=additional_claims)
+
 @auth_bp.route('/api/auth/signup', methods=['POST'])
 def signup():
     try:
@@ -33,7 +57,7 @@ def signup():
         db.session.commit()
         
         # Create access token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'User created successfully',
@@ -44,6 +68,8 @@ def signup():
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'Database error occurred'}), 500
+    except HashingBusy:
+        return hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -61,8 +87,13 @@ def login():
         if not user or not user.verify_password(data['password']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
+        # Upgrade hashes created with older parameters while we have the password
+        if needs_rehash(user.password_hash):
+            user.password = data['password']
+            db.session.commit()
+        
         # Create access token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'Login successful',
@@ -70,21 +101,36 @@ def login():
             'access_token': access_token
         }), 200
         
+    except HashingBusy:
+        return hashing_busy()
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/api/auth/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     try:
+        profile = get_jwt().get('profile')
+        if profile:
+            return jsonify({
+                'user': profile
+            }), 200
+        
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user_data = principal_cache.get(user_id)
         
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        if user_data is MISSING:
+            user = User.query.get(user_id)
+            
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
+            
+            user_data = user.to_dict()
+            principal_cache.set(user_id, user_data)
         
         return jsonify({
-            'user': user.to_dict()
+            'user': user_data
         }), 200
         
     except Exception as e:
@@ -110,12 +156,21 @@ def update_profile():
             user.password = data['password']
         
         db.session.commit()
+        principal_cache.delete(user_id)
         
-        return jsonify({
+        response = {
             'message': 'Profile updated successfully',
             'user': user.to_dict()
-        }), 200
+        }
+        
+        # Tokens carrying the old profile are now stale; hand out a fresh one
+        if current_app.config['JWT_PROFILE_CLAIMS']:
+            response['access_token'] = issue_access_token(user)
+        
+        return jsonify(response), 200
         
+    except HashingBusy:
+        return hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
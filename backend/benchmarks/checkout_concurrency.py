@@ -0,0 +1,96 @@
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import create_benchmark_app, create_user, auth_headers, format_latency, SHIPPING
+
+# Fires parallel checkouts for the same SKU and verifies nothing is oversold.
+#
+#     python -m benchmarks.checkout_concurrency --buyers 200 --stock 50
+
+def setup(app, buyers, stock, quantity):
+    from models import db, Product, CartItem
+
+    with app.app_context():
+        product = Product(name='Flash Sale Tee', price=19.99, category='T-Shirts',
+                          stock_quantity=stock, is_active=True)
+        db.session.add(product)
+        db.session.flush()
+
+        headers = []
+        for i in range(buyers):
+            user = create_user(f'buyer{i}@bench.local')
+            db.session.add(CartItem(user_id=user.id, product_id=product.id, quantity=quantity))
+            headers.append(auth_headers(user.id))
+
+        db.session.commit()
+        return product.id, headers
+
+def checkout(app, headers):
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.post('/api/checkout', json=SHIPPING, headers=headers)
+    latency = time.perf_counter() - start
+
+    # Checkout answers a sold-out SKU with 400 and an insufficient stock
+    # message; any other 400 is a real failure
+    status = response.status_code
+    if status == 400 and not response.get_json()['error'].startswith('Insufficient stock'):
+        status = '400 (other)'
+    return status, latency
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel checkouts against one SKU')
+    parser.add_argument('--buyers', type=int, default=100)
+    parser.add_argument('--stock', type=int, default=40)
+    parser.add_argument('--quantity', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url, serialize_writers=True)
+    product_id, headers = setup(app, args.buyers, args.stock, args.quantity)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(lambda h: checkout(app, h), headers))
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _ in results)
+    latencies = [latency for _, latency in results]
+
+    from models import db, Product, Order
+    with app.app_context():
+        final_stock = db.session.get(Product, product_id).stock_quantity
+        orders = Order.query.count()
+
+    sold = args.stock - final_stock
+    expected_orders = min(args.buyers, args.stock // args.quantity)
+
+    print(f'checkouts: {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)')
+    print(f'statuses:  {dict(sorted(statuses.items(), key=str))}')
+    print(f'latency:   {format_latency(latencies)}')
+    print(f'stock:     {args.stock} -> {final_stock} ({orders} orders)')
+
+    failures = []
+    # Only orders (201) and sold-out rejections (400) are acceptable; errored
+    # checkouts would otherwise drop out of the accounting below
+    unexpected = {status: count for status, count in statuses.items() if status not in (201, 400)}
+    if unexpected:
+        failures.append(f'unexpected statuses {dict(sorted(unexpected.items(), key=str))}')
+    if final_stock < 0:
+        failures.append('stock went negative')
+    if sold != orders * args.quantity:
+        failures.append('stock sold does not match orders created')
+    if statuses[201] != orders:
+        failures.append('201 responses do not match orders created')
+    if orders != expected_orders:
+        failures.append(f'expected {expected_orders} orders')
+
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from sqlalchemy import event
+
+# Shared setup for the benchmark scripts. Run them from the backend
+# directory, e.g. `python -m benchmarks.checkout_concurrency`.
+
+SHIPPING = {
+    'shipping_address': '1 Bench Street',
+    'shipping_city': 'Colombo',
+    'shipping_state': 'Western',
+    'shipping_zip': '00100',
+    'shipping_country': 'Sri Lanka'
+}
+
+def create_benchmark_app(database_url=None, serialize_writers=False):
+    # Defaults to a throwaway SQLite file so worker threads can share it
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    os.environ['TEST_DATABASE_URL'] = database_url
+
+    from app import create_app
+    from models import db
+
+    app = create_app('testing')
+
+    with app.app_context():
+        if serialize_writers and db.engine.dialect.name == 'sqlite':
+            serialize_sqlite_writers(db.engine)
+        db.drop_all()
+        db.create_all()
+
+    return app
+
+def serialize_sqlite_writers(engine):
+    # pysqlite opens transactions lazily and cannot upgrade a read lock to a
+    # write lock under contention; take the write lock up front instead so
+    # concurrent writers queue on the busy timeout rather than failing.
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute('PRAGMA busy_timeout = 30000')
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+def create_user(email, first_name='Bench', last_name='User'):
+    from models import db, User
+
+    # Skip password hashing; benchmark users authenticate with minted tokens
+    user = User(email=email, first_name=first_name, last_name=last_name, password_hash='!')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+def auth_headers(user_id):
+    from flask_jwt_extended import create_access_token
+
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def format_latency(samples):
+    return ' '.join(
+        f'p{pct}={percentile(samples, pct) * 1000:.1f}ms' for pct in (50, 95, 99)
+    )
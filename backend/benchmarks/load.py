@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from benchmarks.common import create_benchmark_app, create_user, auth_headers, percentile, SHIPPING
+
+# End-to-end load run: virtual users drive a weighted mix of storefront
+# scenarios through the app for a fixed time against a synthetic SQLite
+# catalog, then requests/sec, latency percentiles and SQL statements per
+# request are reported per endpoint and checked against a stored baseline.
+#
+#     python -m benchmarks.load                    # compare with the baseline
+#     python -m benchmarks.load --update-baseline  # record a new baseline
+#
+# Latency and throughput depend on the machine, so record the baseline on
+# the machine that runs the comparison. Query counts should not move at all.
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'load.json')
+
+COLORS = ['black', 'white', 'navy', 'olive', 'red', 'grey', 'sand', 'green']
+MATERIALS = ['cotton', 'linen', 'wool', 'denim', 'fleece', 'silk']
+GARMENTS = ['tee', 'shirt', 'jacket', 'hoodie', 'chinos', 'shorts', 'sweater', 'parka']
+CATEGORIES = ['T-Shirts', 'Shirts', 'Jackets', 'Sweatshirts', 'Pants', 'Shorts', 'Knitwear', 'Outerwear']
+
+# Scenario name -> relative weight in the mix
+MIX = {
+    'browse': 50,
+    'search': 20,
+    'cart': 15,
+    'checkout': 5,
+    'admin': 10
+}
+
+def product_records(count, rng):
+    for i in range(count):
+        color, material, garment = rng.choice(COLORS), rng.choice(MATERIALS), rng.choice(GARMENTS)
+        yield i + 1, {
+            'name': f'{color.title()} {material.title()} {garment.title()} {i}',
+            'description': f'A {color} {garment} in {material}.',
+            'price': f'{rng.uniform(10, 150):.2f}',
+            'category': CATEGORIES[GARMENTS.index(garment)],
+            'stock_quantity': 1_000_000
+        }
+
+def setup(app, products, users, orders, seed):
+    from sqlalchemy import insert
+    from catalog_import import import_products
+    from models import db, Order, OrderItem
+
+    rng = random.Random(seed)
+
+    with app.app_context():
+        import_products(product_records(products, rng))
+
+        user_ids = [create_user(f'load{i}@bench.local').id for i in range(users)]
+        db.session.commit()
+
+        # Order history for the admin listing
+        start = datetime.utcnow() - timedelta(days=30)
+        db.session.execute(insert(Order), [
+            {
+                'user_id': user_ids[i % users],
+                'order_number': f'DM-LOAD-{i:06d}',
+                'total_amount': 20,
+                'status': rng.choice(['pending', 'processing', 'shipped']),
+                'created_at': start + timedelta(minutes=i)
+            }
+            for i in range(orders)
+        ])
+        db.session.execute(insert(OrderItem), [
+            {
+                'order_id': i + 1,
+                'product_id': rng.randint(1, products),
+                'product_name': 'Load Item',
+                'product_price': 10,
+                'quantity': 2
+            }
+            for i in range(orders)
+        ])
+        db.session.commit()
+
+        return [auth_headers(user_id) for user_id in user_ids]
+
+class VirtualUser:
+    def __init__(self, client, headers, products, rng, record):
+        self.client = client
+        self.headers = headers
+        self.products = products
+        self.rng = rng
+        self.record = record
+
+    def request(self, label, method, url, auth=False, **kwargs):
+        if auth:
+            kwargs['headers'] = self.headers
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()
+        self.record(label, response.status_code, time.perf_counter() - start)
+        return response
+
+    def product_id(self):
+        return self.rng.randint(1, self.products)
+
+    def browse(self):
+        category = self.rng.choice(CATEGORIES)
+        self.request('GET /api/products', 'GET', f'/api/products?category={category}&page={self.rng.randint(1, 5)}')
+        self.request('GET /api/products?facets', 'GET', f'/api/products?category={category}&facets=true')
+        self.request('GET /api/products/<id>', 'GET', f'/api/products/{self.product_id()}')
+        self.request('GET /api/products/categories', 'GET', '/api/products/categories')
+
+    def search(self):
+        term = self.rng.choice(COLORS + MATERIALS + GARMENTS)
+        self.request('GET /api/products?search', 'GET', f'/api/products?search={term}')
+        self.request('GET /api/products?search&sort', 'GET', f'/api/products?search={term}&sort=relevance')
+
+    def cart(self):
+        self.request('POST /api/cart', 'POST', '/api/cart', auth=True,
+                     json={'product_id': self.product_id(), 'quantity': 1})
+        self.request('GET /api/cart/summary', 'GET', '/api/cart/summary', auth=True)
+        self.request('GET /api/cart', 'GET', '/api/cart', auth=True)
+        self.request('DELETE /api/cart/clear', 'DELETE', '/api/cart/clear', auth=True)
+
+    def checkout(self):
+        self.request('POST /api/cart', 'POST', '/api/cart', auth=True,
+                     json={'product_id': self.product_id(), 'quantity': 1})
+        self.request('POST /api/checkout', 'POST', '/api/checkout', auth=True, json=SHIPPING)
+        self.request('GET /api/orders', 'GET', '/api/orders', auth=True)
+
+    def admin(self):
+        response = self.request('GET /api/admin/orders', 'GET', '/api/admin/orders?cursor=&per_page=50')
+        next_cursor = response.get_json().get('next_cursor')
+        if next_cursor:
+            self.request('GET /api/admin/orders', 'GET', f'/api/admin/orders?cursor={next_cursor}&per_page=50')
+
+class Recorder:
+    def __init__(self, counter):
+        self.counter = counter
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.queries = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    def __call__(self, label, status, latency):
+        queries = self.counter.take()
+        if not self.enabled:
+            return
+        with self._lock:
+            self.samples[label].append(latency)
+            self.queries[label] += queries
+            if status >= 400:
+                self.errors[label] += 1
+
+def run(app, headers, args):
+    from testing import ThreadQueryCounter
+
+    scenarios = list(MIX)
+    weights = [MIX[name] for name in scenarios]
+    stop_event = threading.Event()
+
+    with ThreadQueryCounter() as counter:
+        recorder = Recorder(counter)
+
+        def worker(index):
+            rng = random.Random(args.seed + index)
+            user = VirtualUser(app.test_client(), headers[index], args.products, rng, recorder)
+            while not stop_event.is_set():
+                getattr(user, rng.choices(scenarios, weights)[0])()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+
+        time.sleep(args.warmup)
+        recorder.enabled = True
+        start = time.perf_counter()
+        time.sleep(args.duration)
+        recorder.enabled = False
+        elapsed = time.perf_counter() - start
+
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    return summarize(recorder, elapsed)
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    for label, samples in sorted(recorder.samples.items()):
+        endpoints[label] = {
+            'requests': len(samples),
+            'rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'queries': round(recorder.queries[label] / len(samples), 2),
+            'errors': recorder.errors[label]
+        }
+
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'rps': round(total / elapsed, 1),
+        'requests': total,
+        'endpoints': endpoints
+    }
+
+def print_results(results):
+    print(f"{'endpoint':34} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for label, endpoint in results['endpoints'].items():
+        print(
+            f"{label:34} {endpoint['requests']:>7} {endpoint['rps']:>8} {endpoint['p50_ms']:>8} "
+            f"{endpoint['p95_ms']:>8} {endpoint['p99_ms']:>8} {endpoint['queries']:>8} {endpoint['errors']:>7}"
+        )
+    print(f"total: {results['requests']} requests, {results['rps']} req/s")
+
+def compare(results, baseline, latency_tolerance, query_tolerance, gate_percentile=50):
+    # Returns a list of regressions; missing endpoints count as regressions
+    regressions = []
+    latency_key = f'p{gate_percentile}_ms'
+
+    if results['rps'] < baseline['rps'] * (1 - latency_tolerance):
+        regressions.append(f"throughput {results['rps']} req/s < baseline {baseline['rps']} req/s")
+
+    for label, expected in baseline['endpoints'].items():
+        actual = results['endpoints'].get(label)
+        if actual is None:
+            regressions.append(f'{label}: not exercised')
+            continue
+        if actual['errors']:
+            regressions.append(f"{label}: {actual['errors']} failed requests")
+        if actual[latency_key] > expected[latency_key] * (1 + latency_tolerance):
+            regressions.append(
+                f"{label}: p{gate_percentile} {actual[latency_key]}ms > baseline {expected[latency_key]}ms"
+            )
+        if actual['queries'] > expected['queries'] + query_tolerance:
+            regressions.append(f"{label}: {actual['queries']} queries/request > baseline {expected['queries']}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Storefront load test with a regression baseline')
+    parser.add_argument('--threads', type=int, default=8, help='virtual users')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds first')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                        help='allowed fractional latency/throughput regression (default 0.5)')
+    parser.add_argument('--gate-percentile', type=int, choices=[50, 95, 99], default=50,
+                        help='latency percentile compared with the baseline (default 50; tails are '
+                             'noisy on SQLite, where every transaction queues for the write lock)')
+    parser.add_argument('--query-tolerance', type=float, default=0.5,
+                        help='allowed increase in average queries per request (default 0.5)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    # Concurrent checkouts need queued writers on SQLite
+    app = create_benchmark_app(serialize_writers=True)
+    headers = setup(app, args.products, args.threads, args.orders, args.seed)
+
+    results = run(app, headers, args)
+    results['settings'] = {
+        'threads': args.threads,
+        'duration': args.duration,
+        'products': args.products,
+        'orders': args.orders,
+        'mix': MIX
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --update-baseline to record one')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline.get('settings') != results['settings']:
+        print('warning: baseline was recorded with different settings', file=sys.stderr)
+
+    regressions = compare(
+        results, baseline, args.latency_tolerance, args.query_tolerance, args.gate_percentile
+    )
+    if regressions:
+        print('Regressions against the baseline:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+    print('No regressions against the baseline')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import create_benchmark_app, format_latency
+
+# Login storm with concurrent catalog browsing. Compare inline hashing with
+# the process pool:
+#
+#     python -m benchmarks.login_throughput --hash-workers 0
+#     python -m benchmarks.login_throughput --hash-workers 2
+
+PASSWORD = 'correct horse battery staple'
+
+def setup(app, users):
+    from models import db, User, Product
+
+    with app.app_context():
+        for i in range(users):
+            user = User(email=f'login{i}@bench.local', first_name='Bench', last_name='User')
+            user.password = PASSWORD
+            db.session.add(user)
+        db.session.add(Product(name='Bench Tee', price=10, category='T-Shirts', stock_quantity=10))
+        db.session.commit()
+
+def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = client.open(url, method=method, **kwargs)
+    return response.status_code, time.perf_counter() - start
+
+def browse(app, stop_event, latencies):
+    client = app.test_client()
+    while not stop_event.is_set():
+        _, latency = timed(client, 'GET', '/api/products/categories')
+        latencies.append(latency)
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput under a hashing load')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--browsers', type=int, default=4, help='threads browsing the catalog meanwhile')
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--hash-method', default='scrypt:32768:8:1')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+    app.config['PASSWORD_HASH_METHOD'] = args.hash_method
+    app.config['PASSWORD_HASH_WORKERS'] = args.hash_workers
+    app.config['CACHE_ENABLED'] = False
+    setup(app, args.users)
+
+    def login(i):
+        client = app.test_client()
+        return timed(client, 'POST', '/api/auth/login', json={
+            'email': f'login{i % args.users}@bench.local',
+            'password': PASSWORD
+        })
+
+    stop_event = threading.Event()
+    browse_latencies = []
+    browsers = [
+        threading.Thread(target=browse, args=(app, stop_event, browse_latencies))
+        for _ in range(args.browsers)
+    ]
+    for thread in browsers:
+        thread.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop_event.set()
+    for thread in browsers:
+        thread.join()
+
+    failed = sum(1 for status, _ in results if status != 200)
+    print(f'hash method:  {args.hash_method} (workers={args.hash_workers})')
+    print(f'logins:       {len(results)} in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s), {failed} failed')
+    print(f'login:        {format_latency([latency for _, latency in results])}')
+    print(f'catalog:      {len(browse_latencies)} requests, {format_latency(browse_latencies)}')
+
+if __name__ == '__main__':
+    main()
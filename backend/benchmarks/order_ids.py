@@ -0,0 +1,86 @@
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+
+# Uniqueness and throughput of order number generation: several processes
+# (as gunicorn workers would be), each with several threads, generate as
+# fast as they can. Fails if any number repeats, if a thread ever sees a
+# number lower than its previous one, or if numbers are not time-ordered.
+#
+#     python -m benchmarks.order_ids --processes 4 --threads 8 --count 50000
+
+def generate(slot, threads, count, queue):
+    import order_ids
+
+    order_ids.configure(order_ids.worker_id_for(slot, required=False))
+    results = [None] * threads
+
+    def run(index):
+        numbers = [order_ids.generate_order_number() for _ in range(count)]
+        results[index] = numbers
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    queue.put((slot, elapsed, results))
+
+def main():
+    parser = argparse.ArgumentParser(description='Order number uniqueness and throughput')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--count', type=int, default=50000, help='numbers per thread')
+    args = parser.parse_args()
+
+    from order_ids import parse
+
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=generate, args=(slot, args.threads, args.count, queue))
+        for slot in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    outputs = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    problems = []
+    seen = set()
+    total = 0
+    for slot, elapsed, results in outputs:
+        generated = args.threads * args.count
+        total += generated
+        print(f'process {slot}: {generated} numbers in {elapsed:.2f}s ({generated / elapsed:,.0f}/s)')
+
+        for numbers in results:
+            if any(a >= b for a, b in zip(numbers, numbers[1:])):
+                problems.append(f'process {slot}: numbers went backwards within a thread')
+            seen.update(numbers)
+
+    if len(seen) != total:
+        problems.append(f'{total - len(seen)} duplicate numbers')
+
+    # Sorting the text must sort by creation time
+    ordered = sorted(seen)
+    timestamps = [parse(number)[0] for number in ordered]
+    if timestamps != sorted(timestamps):
+        problems.append('text order differs from time order')
+
+    sample = ordered[-1]
+    print(f'total:     {total} numbers, {len(seen)} unique, e.g. {sample} (length {len(sample)})')
+
+    if problems:
+        for problem in problems:
+            print(f'FAIL {problem}')
+        sys.exit(1)
+    print('All order numbers unique and ordered')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import re
+import sys
+from datetime import datetime, timedelta
+
+# Query plan check: requests each hot endpoint against a small SQLite
+# database, runs EXPLAIN QUERY PLAN on every SELECT it issued and fails if
+# any of them scans a whole table instead of using an index. The same check
+# runs in the test suite (tests/test_query_plans.py); this script prints the
+# plans:
+#
+#     python -m benchmarks.query_plans [--verbose]
+
+SCAN_RE = re.compile(r'^SCAN (\w+)$')
+
+CHECKED_TABLES = {'products', 'orders', 'order_items', 'cart_items', 'users', 'checkout_jobs'}
+
+# (path, authenticated)
+SCENARIOS = [
+    ('/api/products?category=Jackets', False),
+    ('/api/products?category=Jackets&cursor=', False),
+    ('/api/products?category=Jackets&facets=true', False),
+    ('/api/products/categories', False),
+    ('/api/products/2', False),
+    ('/api/cart', True),
+    ('/api/cart/summary', True),
+    ('/api/orders', True),
+    ('/api/orders?cursor=', True),
+    ('/api/orders/1', True),
+    ('/api/admin/orders?status=pending', False),
+    ('/api/admin/orders?status=pending&cursor=', False),
+    ('/api/admin/orders?cursor=', False),
+    ('/api/admin/orders/export?from=2026-01-01&to=2026-02-01', False),
+]
+
+def seed():
+    from models import db, CartItem, Order, OrderItem, Product
+    from benchmarks.common import create_user
+
+    user = create_user('plans@example.com')
+    for i in range(20):
+        db.session.add(Product(
+            name=f'Product {i}', price=10 + i, category='Jackets' if i % 2 else 'Shirts',
+            stock_quantity=10, is_active=i % 5 != 0
+        ))
+    db.session.flush()
+
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        order = Order(
+            user_id=user.id, order_number=f'DM-PLAN-{i}', total_amount=20,
+            status='pending' if i % 2 else 'shipped', created_at=start + timedelta(days=i)
+        )
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderItem(
+            order_id=order.id, product_id=2, product_name='Product 1', product_price=10, quantity=2
+        ))
+    db.session.add(CartItem(user_id=user.id, product_id=2, quantity=1))
+    db.session.commit()
+    return user.id
+
+def full_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    details = [row[-1] for row in plan]
+    scans = {
+        match.group(1) for match in map(SCAN_RE.match, details)
+        if match and match.group(1) in CHECKED_TABLES
+    }
+    return scans, details
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if a hot endpoint query does a full table scan.')
+    parser.add_argument('--verbose', action='store_true', help='Print every plan')
+    args = parser.parse_args()
+
+    from benchmarks.common import create_benchmark_app, auth_headers
+    from cache import cache
+    from models import db
+    from testing import QueryCounter
+
+    app = create_benchmark_app()
+    cache.enabled = False  # every request must reach the database
+    client = app.test_client()
+
+    with app.app_context():
+        user_id = seed()
+        headers = auth_headers(user_id)
+
+    failures = 0
+    for path, authenticated in SCENARIOS:
+        with app.app_context(), QueryCounter() as counter:
+            response = client.get(path, headers=headers if authenticated else None)
+            response.get_data()
+
+        if response.status_code != 200:
+            print(f'ERROR {path}: HTTP {response.status_code}')
+            failures += 1
+            continue
+
+        problems = 0
+        with app.app_context(), db.engine.connect() as connection:
+            for statement, parameters in zip(counter.statements, counter.parameters):
+                if not statement.lstrip().upper().startswith('SELECT'):
+                    continue
+                scans, details = full_scans(connection, statement, parameters)
+                if scans:
+                    problems += 1
+                    print(f"FAIL  {path}: full scan of {', '.join(sorted(scans))}")
+                if scans or args.verbose:
+                    print('      ' + ' '.join(statement.split()))
+                    for detail in details:
+                        print(f'        {detail}')
+
+        if not problems:
+            print(f'ok    {path} ({counter.count} queries)')
+        failures += problems
+
+    if failures:
+        print(f'{failures} problem(s) found')
+        sys.exit(1)
+    print('All query plans use indexes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+# Compares the original to_dict + stdlib json path with the compiled
+# serializers + orjson on synthetic catalogs and order pages:
+#
+#     python -m benchmarks.serialization --products 100 --orders 50
+
+def legacy_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': float(product.price) if product.price else 0.0,
+        'category': product.category,
+        'image_url': product.image_url,
+        'stock_quantity': product.stock_quantity,
+        'is_active': product.is_active
+    }
+
+def legacy_order_item(item):
+    return {
+        'id': item.id,
+        'order_id': item.order_id,
+        'product_id': item.product_id,
+        'product_name': item.product_name,
+        'product_price': float(item.product_price) if item.product_price else 0.0,
+        'quantity': item.quantity,
+        'subtotal': float(item.product_price * item.quantity) if item.product_price else 0.0
+    }
+
+def legacy_order(order):
+    return {
+        'id': order.id,
+        'user_id': order.user_id,
+        'order_number': order.order_number,
+        'total_amount': float(order.total_amount) if order.total_amount else 0.0,
+        'status': order.status,
+        'shipping_address': order.shipping_address,
+        'shipping_city': order.shipping_city,
+        'shipping_state': order.shipping_state,
+        'shipping_zip': order.shipping_zip,
+        'shipping_country': order.shipping_country,
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+        'order_items': [legacy_order_item(item) for item in order.order_items]
+    }
+
+def synthetic_products(count):
+    from models import Product
+
+    return [
+        Product(
+            id=i,
+            name=f'Product {i}',
+            description='Soft cotton, relaxed fit. ' * 8,
+            price=Decimal('24.99') + i,
+            category=f'Category {i % 12}',
+            image_url=f'https://images.example.com/{i}.jpg',
+            stock_quantity=i % 50,
+            is_active=True
+        )
+        for i in range(1, count + 1)
+    ]
+
+def synthetic_orders(count, items_per_order):
+    from models import Order, OrderItem
+
+    orders = []
+    for i in range(1, count + 1):
+        order = Order(
+            id=i, user_id=1, order_number=f'DM-BENCH-{i:06d}', total_amount=Decimal('149.95'),
+            status='pending', shipping_address='1 Bench Street', shipping_city='Colombo',
+            shipping_state='Western', shipping_zip='00100', shipping_country='Sri Lanka',
+            created_at=datetime(2024, 1, 1)
+        )
+        order.order_items = [
+            OrderItem(id=i * 100 + j, order_id=i, product_id=j, product_name=f'Product {j}',
+                      product_price=Decimal('29.99'), quantity=j % 3 + 1)
+            for j in range(items_per_order)
+        ]
+        orders.append(order)
+    return orders
+
+def measure(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Serializer micro-benchmark')
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--items-per-order', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    from serializers import serialize_product, serialize_order, orjson
+
+    if orjson is None:
+        print('orjson is not installed; the new path falls back to the stdlib encoder')
+        fast_dumps = lambda obj: json.dumps(obj, separators=(',', ':'), sort_keys=True)
+    else:
+        option = orjson.OPT_SORT_KEYS
+        fast_dumps = lambda obj: orjson.dumps(obj, option=option)
+
+    legacy_dumps = lambda obj: json.dumps(obj, separators=(',', ':'), sort_keys=True)
+
+    products = synthetic_products(args.products)
+    orders = synthetic_orders(args.orders, args.items_per_order)
+
+    cases = [
+        (f'{args.products} products', products, legacy_product, serialize_product.many),
+        (f'{args.orders} orders x {args.items_per_order} items', orders, legacy_order, serialize_order.many)
+    ]
+
+    for label, rows, legacy, compiled in cases:
+        assert [legacy(row) for row in rows] == compiled(rows)
+
+        old = measure(lambda: legacy_dumps({'items': [legacy(row) for row in rows]}), args.rounds)
+        new = measure(lambda: fast_dumps({'items': compiled(rows)}), args.rounds)
+        print(f'{label:<24} legacy {old * 1000:7.3f}ms   compiled {new * 1000:7.3f}ms   {old / new:4.1f}x')
+
+if __name__ == '__main__':
+    main()
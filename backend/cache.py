@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Two-level read cache: a small in-process LRU in front of a shared backend.
+#
+# Writes delete keys from both levels. Grouped keys (e.g. every catalog
+# listing page) live under a namespace whose version number is stored in the
+# shared backend; bumping the version makes every key in the namespace
+# unreachable at once. Other processes may serve an entry from their local
+# LRU for up to CACHE_LOCAL_TTL seconds after it was invalidated.
+#
+# The memory backend is private to one process, so invalidations never reach
+# other gunicorn workers or the checkout worker: it is for development and
+# tests only. Production uses redis, and gunicorn.conf.py and the
+# checkout-worker command refuse to run more than one process without it.
+
+MISSING = object()
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class MemoryBackend:
+    # Process-local stand-in for a shared backend (single process only)
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, None))
+            self._data[key] = (value + 1, expires_at)
+            return value + 1
+
+class RedisBackend:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the redis package')
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(key)
+        if raw is None:
+            return MISSING
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, json.dumps(value), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+class Cache:
+    def __init__(self):
+        self.enabled = False
+        self.default_ttl = 60
+        self.prefix = 'dm'
+        self.local = LRUCache()
+        self.backend = MemoryBackend()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CACHE_ENABLED', True)
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        self.prefix = app.config.get('CACHE_KEY_PREFIX', 'dm')
+        self.local = LRUCache(
+            maxsize=app.config.get('CACHE_LOCAL_MAXSIZE', 1024),
+            ttl=app.config.get('CACHE_LOCAL_TTL', 5)
+        )
+
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBackend()
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+    @property
+    def shared(self):
+        # Whether other processes see this backend (flags need it even with
+        # caching disabled)
+        return not isinstance(self.backend, MemoryBackend)
+
+    @property
+    def process_local(self):
+        # True when invalidations stay inside this process
+        return self.enabled and not self.shared
+
+    def _full_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        if not self.enabled:
+            return MISSING
+
+        full_key = self._full_key(key)
+        value = self.local.get(full_key)
+        if value is not MISSING:
+            return value
+
+        value = self.backend.get(full_key)
+        if value is not MISSING:
+            self.local.set(full_key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+
+        full_key = self._full_key(key)
+        self.local.set(full_key, value)
+        self.backend.set(full_key, value, ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        full_keys = [self._full_key(key) for key in keys]
+        for full_key in full_keys:
+            self.local.delete(full_key)
+        self.backend.delete(*full_keys)
+
+    # Flags are shared markers (e.g. replica stickiness) rather than cached
+    # data: they skip the local tier and are honoured with caching disabled
+    def set_flag(self, key, ttl):
+        self.backend.set(self._full_key(f'flag:{key}'), 1, ttl)
+
+    def has_flag(self, key):
+        return self.backend.get(self._full_key(f'flag:{key}')) is not MISSING
+
+    def namespace_key(self, namespace, *parts):
+        version = self.backend.get(self._full_key(f'ns:{namespace}'))
+        if version is MISSING:
+            version = 0
+        key = ':'.join('' if part is None else str(part) for part in parts)
+        return f'{namespace}:v{version}:{key}'
+
+    def bump(self, namespace):
+        self.backend.incr(self._full_key(f'ns:{namespace}'))
+
+    def cached(self, key, loader, ttl=None):
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+cache = Cache()
@@ -1,10 +1,61 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, CartItem, Product
+from sqlalchemy import and_, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import joinedload
+from datetime import datetime
+import hashlib
 
 cart_bp = Blueprint('cart', __name__)
 
+MAX_BATCH_OPERATIONS = 100
+
+def upsert_cart_items(rows):
+    # INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE, adding to the
+    # quantity already in the cart (unique_user_product_cart)
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        merge_cart_items(rows)
+        return
+    
+    stmt = insert(CartItem).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'product_id'],
+        set_={
+            'quantity': CartItem.quantity + stmt.excluded.quantity,
+            'updated_at': stmt.excluded.updated_at
+        }
+    )
+    db.session.execute(stmt)
+
+def merge_cart_items(rows):
+    # Fallback for databases without ON CONFLICT: update the lines already
+    # in the cart and add the rest (rows all belong to one user)
+    existing = {
+        item.product_id: item for item in CartItem.query.filter(
+            CartItem.user_id == rows[0]['user_id'],
+            CartItem.product_id.in_([row['product_id'] for row in rows])
+        )
+    }
+    
+    for row in rows:
+        cart_item = existing.get(row['product_id'])
+        if cart_item:
+            cart_item.quantity += row['quantity']
+            cart_item.updated_at = row['updated_at']
+        else:
+            db.session.add(CartItem(**row))
+    
+    db.session.flush()
+
+def is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
 @cart_bp.route('/api/cart', methods=['GET'])
 @jwt_required()
 def get_cart():
@@ -28,6 +79,34 @@ def get_cart():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@cart_bp.route('/api/cart/summary', methods=['GET'])
+@jwt_required()
+def get_cart_summary():
+    # Count and total for the header badge, aggregated in SQL
+    try:
+        user_id = get_jwt_identity()
+        
+        total_items, total_price = db.session.query(
+            func.coalesce(func.sum(CartItem.quantity), 0),
+            func.coalesce(func.sum(CartItem.quantity * Product.price), 0)
+        ).join(
+            Product, CartItem.product_id == Product.id
+        ).filter(CartItem.user_id == user_id).one()
+        
+        summary = {
+            'total_items': int(total_items),
+            'total_price': round(float(total_price), 2)
+        }
+        etag = hashlib.sha1(f"{summary['total_items']}:{summary['total_price']}".encode()).hexdigest()
+        
+        response = jsonify(summary)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @cart_bp.route('/api/cart', methods=['POST'])
 @jwt_required()
 def add_to_cart():
@@ -81,6 +160,83 @@ def add_to_cart():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@cart_bp.route('/api/cart/batch', methods=['POST'])
+@jwt_required()
+def batch_add_to_cart():
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        operations = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} items per batch'}), 400
+        
+        # Validate operations and merge repeated products
+        requested = {}
+        for operation in operations:
+            if not isinstance(operation, dict) or operation.get('product_id') is None:
+                return jsonify({'error': 'Product ID is required'}), 400
+            
+            if not is_positive_int(operation['product_id']):
+                return jsonify({'error': 'Product ID must be a positive integer'}), 400
+            
+            quantity = operation.get('quantity', 1)
+            if not is_positive_int(quantity):
+                return jsonify({'error': 'Quantity must be at least 1'}), 400
+            
+            product_id = operation['product_id']
+            requested[product_id] = requested.get(product_id, 0) + quantity
+        
+        # Load every product and its current cart quantity in one query
+        rows = db.session.query(Product, CartItem.quantity).outerjoin(
+            CartItem,
+            and_(CartItem.product_id == Product.id, CartItem.user_id == user_id)
+        ).filter(Product.id.in_(requested)).all()
+        
+        found = {product.id: (product, in_cart or 0) for product, in_cart in rows}
+        
+        for product_id, quantity in requested.items():
+            product, in_cart = found.get(product_id, (None, 0))
+            
+            if not product or not product.is_active:
+                return jsonify({'error': f'Product {product_id} not found or unavailable'}), 404
+            
+            if product.stock_quantity < in_cart + quantity:
+                return jsonify({'error': f'Insufficient stock for {product.name}'}), 400
+        
+        # Apply all operations in a single statement
+        now = datetime.utcnow()
+        upsert_cart_items([
+            {
+                'user_id': user_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'created_at': now,
+                'updated_at': now
+            }
+            for product_id, quantity in requested.items()
+        ])
+        db.session.commit()
+        
+        cart_items = CartItem.query.options(
+            joinedload(CartItem.product)
+        ).filter(
+            CartItem.user_id == user_id,
+            CartItem.product_id.in_(requested)
+        ).all()
+        
+        return jsonify({
+            'message': 'Items added to cart',
+            'cart_items': [item.to_dict() for item in cart_items]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @cart_bp.route('/api/cart/<int:item_id>', methods=['PUT'])
 @jwt_required()
 def update_cart_item(item_id):
@@ -0,0 +1,348 @@
+import click
+import csv
+import gzip
+import io
+import json
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+from models import db, Product
+from search import index_products
+from products import invalidate_products
+
+# Bulk catalog import from CSV or NDJSON (one JSON object per line).
+#
+# Rows are read and validated one at a time and written in batches of
+# IMPORT_BATCH_SIZE (at most MAX_BATCH_SIZE), each in its own transaction,
+# so memory use does not grow with the size of the feed. A row with an id replaces that product
+# (or creates it with that id); a row without one creates a new product.
+# Invalid rows are skipped and reported by line number.
+#
+# PostgreSQL: each batch is COPYed into a temporary staging table and
+# upserted with one INSERT ... SELECT ... ON CONFLICT.
+# SQLite: one executemany upsert whose RETURNING rows feed the FTS index.
+
+logger = logging.getLogger(__name__)
+
+catalog_import_bp = Blueprint('catalog_import', __name__)
+
+MAX_BATCH_SIZE = 5000
+
+IMPORT_COLUMNS = ('id', 'name', 'description', 'price', 'category', 'image_url', 'stock_quantity', 'is_active')
+REQUIRED_COLUMNS = ('name', 'price', 'category')
+FORMATS = ('csv', 'ndjson')
+MAX_REPORTED_ERRORS = 100
+
+BOOLEAN_VALUES = {
+    'true': True, '1': True, 'yes': True, 'y': True,
+    'false': False, '0': False, 'no': False, 'n': False
+}
+
+class ImportFormatError(ValueError):
+    pass
+
+class InvalidRow(ValueError):
+    pass
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+# Readers yield (line_number, record) without loading the whole input
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing: {', '.join(missing)}")
+
+    for record in reader:
+        yield reader.line_num, record
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record
+
+def open_records(stream, feed_format, compressed=False):
+    # stream is a binary file object
+    if feed_format not in FORMATS:
+        raise ImportFormatError(f"Unsupported format: {feed_format} (expected {' or '.join(FORMATS)})")
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream)
+    stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return read_csv(stream) if feed_format == 'csv' else read_ndjson(stream)
+
+def detect_format(content_type=None, filename=None):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    filename = (filename or '').lower().removesuffix('.gz')
+
+    if content_type in ('text/csv', 'application/csv') or filename.endswith('.csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl') \
+            or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+# Validation
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _text(record, field, max_length=None, required=False):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise InvalidRow(f'{field} is required')
+        return None
+    value = str(value).strip()
+    if max_length and len(value) > max_length:
+        raise InvalidRow(f'{field} must be at most {max_length} characters')
+    return value
+
+def _integer(record, field, default=None, minimum=0):
+    value = record.get(field)
+    if _blank(value):
+        return default
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise InvalidRow(f'{field} must be an integer')
+    try:
+        value = int(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        raise InvalidRow(f'{field} must be an integer')
+    if value < minimum:
+        raise InvalidRow(f'{field} must be at least {minimum}')
+    return value
+
+def _price(record):
+    value = record.get('price')
+    if _blank(value):
+        raise InvalidRow('price is required')
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise InvalidRow('price must be a number')
+    if not price.is_finite() or price < 0:
+        raise InvalidRow('price must be a non-negative number')
+    if price >= Decimal('1e8'):
+        raise InvalidRow('price is too large')
+    return price.quantize(Decimal('0.01'))
+
+def _boolean(record, field, default):
+    value = record.get(field)
+    if _blank(value):
+        return default
+    if isinstance(value, bool):
+        return value
+    try:
+        return BOOLEAN_VALUES[str(value).strip().lower()]
+    except KeyError:
+        raise InvalidRow(f'{field} must be true or false')
+
+def validate_row(record):
+    if not isinstance(record, dict):
+        raise InvalidRow('Row is not a JSON object')
+
+    return {
+        'id': _integer(record, 'id', minimum=1),
+        'name': _text(record, 'name', 200, required=True),
+        'description': _text(record, 'description') or '',
+        'price': _price(record),
+        'category': _text(record, 'category', 100, required=True),
+        'image_url': _text(record, 'image_url', 500),
+        'stock_quantity': _integer(record, 'stock_quantity', default=0),
+        'is_active': _boolean(record, 'is_active', True)
+    }
+
+# Writers
+
+STAGING_TABLE_SQL = text(
+    'CREATE TEMPORARY TABLE products_import ('
+    'id integer, name varchar(200), description text, price numeric(10, 2), '
+    'category varchar(100), image_url varchar(500), stock_quantity integer, is_active boolean'
+    ') ON COMMIT DROP'
+)
+
+UPDATE_COLUMNS = [column for column in IMPORT_COLUMNS if column != 'id']
+
+PG_UPSERT_SQL = text(
+    f"INSERT INTO products ({', '.join(IMPORT_COLUMNS)}, created_at, updated_at) "
+    f"SELECT coalesce(id, nextval(pg_get_serial_sequence('products', 'id'))), "
+    f"{', '.join(UPDATE_COLUMNS)}, :now, :now FROM products_import "
+    f"ON CONFLICT (id) DO UPDATE SET "
+    f"{', '.join(f'{column} = excluded.{column}' for column in UPDATE_COLUMNS)}, "
+    f"updated_at = excluded.updated_at "
+    f"RETURNING id"
+)
+
+# Keeps the id sequence ahead of ids supplied by the feed
+PG_SYNC_SEQUENCE_SQL = text(
+    "SELECT setval(pg_get_serial_sequence('products', 'id'), (SELECT max(id) FROM products))"
+)
+
+def _write_postgresql(rows, now):
+    connection = db.session.connection()
+    connection.execute(STAGING_TABLE_SQL)
+
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        with cursor.copy(f"COPY products_import ({', '.join(IMPORT_COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[column] for column in IMPORT_COLUMNS])
+    finally:
+        cursor.close()
+
+    product_ids = connection.execute(PG_UPSERT_SQL, {'now': now}).scalars().all()
+    if any(row['id'] is not None for row in rows):
+        connection.execute(PG_SYNC_SEQUENCE_SQL)
+    return product_ids
+
+def _write_sqlite(rows, now):
+    products = Product.__table__
+    stmt = sqlite.insert(products)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS + ['updated_at']}
+    ).returning(products.c.id, products.c.name, products.c.description)
+
+    # Batched into multi-row INSERTs by SQLAlchemy ("insertmanyvalues")
+    written = db.session.execute(
+        stmt, [{**row, 'created_at': now, 'updated_at': now} for row in rows]
+    ).all()
+
+    index_products(written)
+    return [product_id for product_id, _, _ in written]
+
+def _write_generic(rows, now):
+    # Databases without a bulk upsert: load the products the batch names,
+    # update them and add the rest through the ORM
+    ids = [row['id'] for row in rows if row['id'] is not None]
+    existing = {product.id: product for product in Product.query.filter(Product.id.in_(ids))} if ids else {}
+
+    products = []
+    for row in rows:
+        product = existing.get(row['id'])
+        if product is None:
+            product = Product(id=row['id'], created_at=now)
+            db.session.add(product)
+        for column in UPDATE_COLUMNS:
+            setattr(product, column, row[column])
+        product.updated_at = now
+        products.append(product)
+
+    db.session.flush()
+    index_products([(product.id, product.name, product.description) for product in products])
+    return [product.id for product in products]
+
+def write_batch(rows):
+    dialect = db.engine.dialect.name
+    now = datetime.utcnow()
+
+    if dialect == 'postgresql':
+        product_ids = _write_postgresql(rows, now)
+    elif dialect == 'sqlite':
+        product_ids = _write_sqlite(rows, now)
+    else:
+        product_ids = _write_generic(rows, now)
+
+    db.session.commit()
+    invalidate_products(*product_ids)
+    return len(product_ids)
+
+def import_products(records, batch_size=None):
+    batch_size = min(max(batch_size or current_app.config['IMPORT_BATCH_SIZE'], 1), MAX_BATCH_SIZE)
+    report = ImportReport()
+
+    # Keyed by id so a product repeated within a batch is written once
+    # (last row wins); new products are keyed by line number
+    batch = {}
+
+    def flush():
+        rows = list(batch.values())
+        batch.clear()
+        try:
+            report.imported += write_batch([row for _, row in rows])
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Catalog import batch failed')
+            for line, _ in rows:
+                report.add_error(line, f'Batch failed: {e}')
+
+    for line, record in records:
+        report.processed += 1
+        try:
+            row = validate_row(record)
+        except InvalidRow as e:
+            report.add_error(line, str(e))
+            continue
+
+        key = ('id', row['id']) if row['id'] is not None else ('line', line)
+        batch[key] = (line, row)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return report
+
+def import_file(path, feed_format=None, batch_size=None):
+    # path may be '-' for stdin; .gz files are decompressed on the fly
+    feed_format = feed_format or detect_format(filename=path)
+    if not feed_format:
+        raise ImportFormatError(f'Cannot tell the format of {path}; pass csv or ndjson explicitly')
+
+    with click.open_file(path, 'rb') as stream:
+        return import_products(open_records(stream, feed_format, path.endswith('.gz')), batch_size)
+
+# Admin endpoint (request body is the feed itself, e.g. curl --data-binary @feed.csv)
+@catalog_import_bp.route('/api/admin/products/import', methods=['POST'])
+def import_catalog():
+    try:
+        feed_format = request.args.get('format') or detect_format(request.content_type)
+        if not feed_format:
+            return jsonify({'error': 'Send text/csv or application/x-ndjson, or pass ?format='}), 400
+
+        batch_size = request.args.get('batch_size', type=int)
+        compressed = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+
+        records = open_records(request.stream, feed_format, compressed)
+        report = import_products(records, batch_size)
+
+        return jsonify({
+            'message': 'Import finished',
+            'report': report.to_dict()
+        }), 200
+
+    except (ImportFormatError, UnicodeDecodeError, csv.Error, OSError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -1,17 +1,182 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, CartItem, Order, OrderItem, Product
-from sqlalchemy.orm import joinedload
-import random
-import string
-from datetime import datetime
+from models import db, CartItem, CheckoutJob, Order, OrderItem, Product
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import joinedload, selectinload
+from pagination import keyset_page, clamp_per_page, InvalidCursor
+from products import invalidate_products
+from serializers import serialize_order, serialize_order_summary, parse_fields, column_attributes, InvalidFields
+from sqlalchemy.orm import load_only
+from middleware import set_last_modified
+from metrics import ORDERS_CREATED, CHECKOUT_FAILURES
+from order_ids import generate_order_number
 
 checkout_bp = Blueprint('checkout', __name__)
 
-def generate_order_number():
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f'DM-{timestamp}-{random_str}'
+def reserve_stock(quantities):
+    # quantities maps product_id -> quantity to take. Returns False (without
+    # touching any row) unless every product is active and has enough stock.
+    requested = case(quantities, value=Product.id)
+    
+    result = db.session.execute(
+        update(Product)
+        .where(
+            Product.id.in_(quantities),
+            Product.is_active == True,
+            Product.stock_quantity >= requested
+        )
+        .values(stock_quantity=Product.stock_quantity - requested)
+        .execution_options(synchronize_session=False)
+    )
+    
+    return result.rowcount == len(quantities)
+
+def insufficient_stock_message(quantities):
+    products = Product.query.filter(Product.id.in_(quantities)).order_by(Product.id).all()
+    
+    for product in products:
+        if not product.is_active:
+            return f'Product {product.name} is unavailable'
+        if product.stock_quantity < quantities[product.id]:
+            return f'Insufficient stock for {product.name}. Available: {product.stock_quantity}'
+    
+    return 'Insufficient stock'
+
+SHIPPING_FIELDS = ['shipping_address', 'shipping_city', 'shipping_state', 'shipping_zip', 'shipping_country']
+
+class CheckoutError(Exception):
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason  # label for the checkout_failures_total metric
+
+def cart_snapshot(user_id):
+    # The cart's lines as stored with a queued checkout
+    rows = db.session.query(
+        CartItem.product_id, CartItem.quantity
+    ).filter_by(user_id=user_id).order_by(CartItem.id).all()
+    
+    return [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in rows]
+
+def place_order(user_id, shipping, order_number=None, items=None):
+    # Turns the user's cart (or, for queued checkouts, the cart_snapshot
+    # taken when the buyer submitted) into an order inside the current
+    # transaction. The caller commits; returns the order and the ids of
+    # products whose stock changed. Raises CheckoutError for problems the
+    # buyer can fix.
+    
+    if items is None:
+        cart_items = CartItem.query.options(
+            joinedload(CartItem.product)
+        ).filter_by(user_id=user_id).all()
+        lines = [(cart_item.product, cart_item.quantity) for cart_item in cart_items]
+    else:
+        products = Product.query.filter(
+            Product.id.in_([item['product_id'] for item in items])
+        ).all()
+        products_by_id = {product.id: product for product in products}
+        lines = [(products_by_id.get(item['product_id']), item['quantity']) for item in items]
+    
+    if not lines:
+        raise CheckoutError('Cart is empty', 'empty_cart')
+    
+    # Check stock and calculate total
+    total_amount = 0
+    order_items_data = []
+    
+    for product, quantity in lines:
+        if not product or not product.is_active:
+            raise CheckoutError(f'Product {product.name if product else "Unknown"} is unavailable', 'unavailable')
+        
+        if product.stock_quantity < quantity:
+            raise CheckoutError(
+                f'Insufficient stock for {product.name}. Available: {product.stock_quantity}',
+                'insufficient_stock'
+            )
+        
+        item_total = product.price * quantity
+        total_amount += item_total
+        
+        order_items_data.append({
+            'product': product,
+            'quantity': quantity,
+            'price': product.price
+        })
+    
+    # Reserve stock for every line in one conditional UPDATE. Rows whose
+    # stock changed since the check above fail the WHERE clause, so
+    # concurrent checkouts can never oversell.
+    quantities = {item_data['product'].id: item_data['quantity'] for item_data in order_items_data}
+    
+    if not reserve_stock(quantities):
+        db.session.rollback()
+        raise CheckoutError(insufficient_stock_message(quantities), 'insufficient_stock')
+    
+    # Create order
+    order = Order(
+        user_id=user_id,
+        order_number=order_number or generate_order_number(),
+        total_amount=total_amount,
+        status='pending',
+        shipping_address=shipping['shipping_address'],
+        shipping_city=shipping['shipping_city'],
+        shipping_state=shipping['shipping_state'],
+        shipping_zip=shipping['shipping_zip'],
+        shipping_country=shipping['shipping_country']
+    )
+    
+    db.session.add(order)
+    db.session.flush()  # Get order ID
+    
+    # Create order items in a single bulk insert
+    db.session.execute(insert(OrderItem), [
+        {
+            'order_id': order.id,
+            'product_id': item_data['product'].id,
+            'product_name': item_data['product'].name,
+            'product_price': item_data['price'],
+            'quantity': item_data['quantity']
+        }
+        for item_data in order_items_data
+    ])
+    
+    # Clear cart (only the ordered products when placing a snapshot, so
+    # anything added after submitting stays in the cart)
+    cart_query = CartItem.query.filter_by(user_id=user_id)
+    if items is None:
+        cart_query.delete()
+    elif cart_query.filter(CartItem.product_id.in_(list(quantities))).delete() < len(quantities):
+        # Another checkout of the same cart (a double submit) already took
+        # these lines; the row locks make this hold for concurrent workers
+        db.session.rollback()
+        raise CheckoutError('Cart is empty', 'empty_cart')
+    
+    return order, list(quantities)
+
+def pending_checkout(user_id, items):
+    # A queued or running job for the same cart, so a double submit gets
+    # the first job back instead of a second order
+    jobs = CheckoutJob.query.filter(
+        CheckoutJob.user_id == user_id,
+        CheckoutJob.status.in_(('queued', 'processing'))
+    ).order_by(CheckoutJob.id).all()
+    
+    for job in jobs:
+        if job.payload.get('items') == items:
+            return job
+    return None
+
+def enqueue_checkout(user_id, shipping, items):
+    job = CheckoutJob(
+        user_id=user_id,
+        order_number=generate_order_number(),
+        payload={'shipping': shipping, 'items': items},
+        status='queued'
+    )
+    
+    db.session.add(job)
+    db.session.commit()
+    
+    return job
 
 @checkout_bp.route('/api/checkout', methods=['POST'])
 @jwt_required()
@@ -21,104 +186,117 @@ def create_order():
         data = request.get_json()
         
         # Get shipping information
-        required_shipping_fields = ['shipping_address', 'shipping_city', 'shipping_state', 'shipping_zip', 'shipping_country']
-        for field in required_shipping_fields:
+        for field in SHIPPING_FIELDS:
             if not data.get(field):
+                CHECKOUT_FAILURES.labels('invalid_shipping').inc()
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Get cart items
-        cart_items = CartItem.query.options(
-            joinedload(CartItem.product)
-        ).filter_by(user_id=user_id).all()
-        
-        if not cart_items:
-            return jsonify({'error': 'Cart is empty'}), 400
+        shipping = {field: data[field] for field in SHIPPING_FIELDS}
         
-        # Check stock and calculate total
-        total_amount = 0
-        order_items_data = []
-        
-        for cart_item in cart_items:
-            product = cart_item.product
-            
-            if not product or not product.is_active:
-                return jsonify({'error': f'Product {product.name if product else "Unknown"} is unavailable'}), 400
+        # Async mode (server-side only, as it needs a checkout worker
+        # running): queue the cart as submitted and let the worker pool
+        # place it
+        if current_app.config['CHECKOUT_ASYNC']:
+            items = cart_snapshot(user_id)
+            if not items:
+                CHECKOUT_FAILURES.labels('empty_cart').inc()
+                return jsonify({'error': 'Cart is empty'}), 400
             
-            if product.stock_quantity < cart_item.quantity:
-                return jsonify({
-                    'error': f'Insufficient stock for {product.name}. Available: {product.stock_quantity}'
-                }), 400
+            job = pending_checkout(user_id, items) or enqueue_checkout(user_id, shipping, items)
+            status_url = url_for('checkout.get_order_by_number', order_number=job.order_number)
             
-            item_total = product.price * cart_item.quantity
-            total_amount += item_total
-            
-            order_items_data.append({
-                'product': product,
-                'quantity': cart_item.quantity,
-                'price': product.price
+            response = jsonify({
+                'message': 'Order queued',
+                'order_number': job.order_number,
+                'status': job.status,
+                'status_url': status_url
             })
+            response.headers['Location'] = status_url
+            return response, 202
         
-        # Create order
-        order = Order(
-            user_id=user_id,
-            order_number=generate_order_number(),
-            total_amount=total_amount,
-            status='pending',
-            shipping_address=data['shipping_address'],
-            shipping_city=data['shipping_city'],
-            shipping_state=data['shipping_state'],
-            shipping_zip=data['shipping_zip'],
-            shipping_country=data['shipping_country']
-        )
-        
-        db.session.add(order)
-        db.session.flush()  # Get order ID
-        
-        # Create order items and update stock
-        for item_data in order_items_data:
-            product = item_data['product']
-            
-            # Create order item
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                product_name=product.name,
-                product_price=product.price,
-                quantity=item_data['quantity']
-            )
-            db.session.add(order_item)
-            
-            # Update product stock
-            product.stock_quantity -= item_data['quantity']
-        
-        # Clear cart
-        CartItem.query.filter_by(user_id=user_id).delete()
-        
+        order, product_ids = place_order(user_id, shipping)
         db.session.commit()
+        ORDERS_CREATED.labels('sync').inc()
+        
+        # Stock changed for every purchased product
+        invalidate_products(*product_ids)
         
         return jsonify({
             'message': 'Order created successfully',
             'order': order.to_dict()
         }), 201
         
+    except CheckoutError as e:
+        db.session.rollback()
+        CHECKOUT_FAILURES.labels(e.reason).inc()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
+        CHECKOUT_FAILURES.labels('error').inc()
         return jsonify({'error': str(e)}), 500
 
+def order_summaries(user_id):
+    # One row per order with its item count and the first item's product
+    # image, computed in the database; line items are left to the detail view
+    item_count = select(
+        func.coalesce(func.sum(OrderItem.quantity), 0)
+    ).where(OrderItem.order_id == Order.id).scalar_subquery()
+    
+    thumbnail_url = select(Product.image_url).join(
+        OrderItem, OrderItem.product_id == Product.id
+    ).where(OrderItem.order_id == Order.id).order_by(
+        OrderItem.id
+    ).limit(1).scalar_subquery()
+    
+    return db.session.query(
+        Order.id,
+        Order.order_number,
+        Order.status,
+        Order.total_amount,
+        Order.created_at,
+        item_count.label('item_count'),
+        thumbnail_url.label('thumbnail_url')
+    ).filter(Order.user_id == user_id)
+
 @checkout_bp.route('/api/orders', methods=['GET'])
 @jwt_required()
 def get_orders():
     try:
         user_id = get_jwt_identity()
+        cursor = request.args.get('cursor')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
         
-        orders = Order.query.filter_by(user_id=user_id).order_by(
-            Order.created_at.desc()
-        ).all()
+        query = order_summaries(user_id)
+        
+        # Cursor pagination (opt-in with ?cursor=, empty for the first page)
+        if cursor is not None:
+            rows, next_cursor = keyset_page(
+                query, [Order.created_at, Order.id], cursor, per_page, descending=True
+            )
+            
+            return jsonify({
+                'orders': serialize_order_summary.many(rows),
+                'next_cursor': next_cursor,
+                'per_page': per_page
+            }), 200
+        
+        # Counted without the per-order subqueries
+        total = Order.query.filter_by(user_id=user_id).count()
+        rows = query.order_by(
+            Order.created_at.desc(), Order.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page).all()
         
         return jsonify({
-            'orders': [order.to_dict() for order in orders]
+            'orders': serialize_order_summary.many(rows),
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': -(-total // per_page)
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -128,7 +306,9 @@ def get_order(order_id):
     try:
         user_id = get_jwt_identity()
         
-        order = Order.query.filter_by(
+        order = Order.query.options(
+            selectinload(Order.order_items)
+        ).filter_by(
             id=order_id,
             user_id=user_id
         ).first()
@@ -136,6 +316,8 @@ def get_order(order_id):
         if not order:
             return jsonify({'error': 'Order not found'}), 404
         
+        set_last_modified(order.updated_at)
+        
         return jsonify({
             'order': order.to_dict()
         }), 200
@@ -143,33 +325,93 @@ def get_order(order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@checkout_bp.route('/api/orders/<order_number>', methods=['GET'])
+@jwt_required()
+def get_order_by_number(order_number):
+    # Also reports the progress of checkouts queued in async mode
+    try:
+        user_id = get_jwt_identity()
+        
+        order = Order.query.options(
+            selectinload(Order.order_items)
+        ).filter_by(
+            order_number=order_number,
+            user_id=user_id
+        ).first()
+        
+        job = CheckoutJob.query.filter_by(
+            order_number=order_number,
+            user_id=user_id
+        ).first()
+        
+        if not order and not job:
+            return jsonify({'error': 'Order not found'}), 404
+        
+        response = {}
+        if job:
+            response['job'] = job.to_dict()
+        if order:
+            response['order'] = order.to_dict()
+            set_last_modified(order.updated_at)
+        
+        status_code = 202 if job and job.status in ('queued', 'processing') else 200
+        return jsonify(response), status_code
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Admin endpoints
 @checkout_bp.route('/api/admin/orders', methods=['GET'])
 def get_all_orders():
     try:
         status = request.args.get('status')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Order.query
+        cursor = request.args.get('cursor')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
+        include_total = request.args.get('count', 'false').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'), serialize_order)
+        serializer = serialize_order.only(fields)
+        
+        # created_at is always loaded for ordering and cursors
+        query = Order.query.options(
+            load_only(*column_attributes(Order, fields, always=('id', 'created_at')))
+        )
+        if 'order_items' in fields:
+            query = query.options(selectinload(Order.order_items))
         
         if status:
             query = query.filter_by(status=status)
         
+        # Cursor pagination (opt-in with ?cursor=, empty for the first page)
+        if cursor is not None:
+            items, next_cursor = keyset_page(
+                query, [Order.created_at, Order.id], cursor, per_page, descending=True
+            )
+            
+            response = {
+                'orders': serializer.many(items),
+                'next_cursor': next_cursor,
+                'per_page': per_page
+            }
+            if include_total:
+                response['total'] = query.count()
+            
+            return jsonify(response), 200
+        
         paginated = query.order_by(
             Order.created_at.desc()
         ).paginate(page=page, per_page=per_page, error_out=False)
         
-        orders = [order.to_dict() for order in paginated.items]
-        
         return jsonify({
-            'orders': orders,
+            'orders': serializer.many(paginated.items),
             'total': paginated.total,
             'page': paginated.page,
             'per_page': paginated.per_page,
             'pages': paginated.pages
         }), 200
         
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
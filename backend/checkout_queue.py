@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from models import db, CheckoutJob
+from checkout import place_order, CheckoutError
+from products import invalidate_products
+from metrics import ORDERS_CREATED, CHECKOUT_FAILURES
+
+# Worker side of async checkout. Jobs are rows in checkout_jobs: the web
+# process inserts them as 'queued' with the shipping details and a snapshot
+# of the cart, and workers claim them in batches, place the order from the
+# snapshot and mark them 'completed' or 'failed'.
+
+logger = logging.getLogger(__name__)
+
+def claim_jobs(batch_size):
+    query = db.session.query(CheckoutJob.id).filter_by(
+        status='queued'
+    ).order_by(CheckoutJob.id).limit(batch_size)
+
+    # Concurrent workers skip each other's rows instead of queueing on them
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+
+    candidate_ids = [row.id for row in query]
+    if not candidate_ids:
+        db.session.rollback()
+        return []
+
+    # The status guard makes the claim safe on databases without SKIP LOCKED
+    claimed = db.session.execute(
+        update(CheckoutJob)
+        .where(CheckoutJob.id.in_(candidate_ids), CheckoutJob.status == 'queued')
+        .values(
+            status='processing',
+            attempts=CheckoutJob.attempts + 1,
+            updated_at=datetime.utcnow()
+        )
+        .returning(CheckoutJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.session.commit()
+
+    return sorted(claimed)
+
+def requeue_stale_jobs(stale_after):
+    # Jobs left 'processing' by a worker that died go back on the queue
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    result = db.session.execute(
+        update(CheckoutJob)
+        .where(CheckoutJob.status == 'processing', CheckoutJob.updated_at < cutoff)
+        .values(status='queued', updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def process_job(job_id, max_attempts):
+    job = db.session.get(CheckoutJob, job_id)
+
+    # Jobs queued before cart snapshots hold only the shipping details
+    payload = job.payload
+    shipping = payload.get('shipping', payload)
+    items = payload.get('items')
+
+    try:
+        order, product_ids = place_order(job.user_id, shipping, job.order_number, items)
+        job.status = 'completed'
+        job.order_id = order.id
+        job.error = None
+        db.session.commit()
+
+    except CheckoutError as e:
+        db.session.rollback()
+        job = db.session.get(CheckoutJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+        CHECKOUT_FAILURES.labels(e.reason).inc()
+        return False
+
+    except Exception as e:
+        logger.exception('Checkout job %s failed', job_id)
+        db.session.rollback()
+        job = db.session.get(CheckoutJob, job_id)
+        job.status = 'queued' if job.attempts < max_attempts else 'failed'
+        job.error = str(e)
+        db.session.commit()
+        CHECKOUT_FAILURES.labels('error').inc()
+        return False
+
+    # The order is committed, so a failure from here on must not requeue
+    # the job (the retry would collide with its own order number)
+    try:
+        ORDERS_CREATED.labels('async').inc()
+        invalidate_products(*product_ids)
+    except Exception:
+        logger.exception('Post-checkout cleanup for job %s failed', job_id)
+    return True
+
+def process_batch(batch_size, max_attempts=3):
+    # Returns the number of jobs handled
+    job_ids = claim_jobs(batch_size)
+    for job_id in job_ids:
+        process_job(job_id, max_attempts)
+    return len(job_ids)
+
+def worker_loop(app, stop_event):
+    batch_size = app.config['CHECKOUT_BATCH_SIZE']
+    max_attempts = app.config['CHECKOUT_MAX_ATTEMPTS']
+    poll_interval = app.config['CHECKOUT_POLL_INTERVAL']
+
+    while not stop_event.is_set():
+        try:
+            with app.app_context():
+                handled = process_batch(batch_size, max_attempts)
+        except Exception:
+            logger.exception('Checkout worker error')
+            handled = 0
+
+        if not handled:
+            stop_event.wait(poll_interval)
+
+def run_workers(app, workers=None, stop_event=None):
+    workers = workers or app.config['CHECKOUT_WORKERS']
+    stop_event = stop_event or threading.Event()
+
+    with app.app_context():
+        requeued = requeue_stale_jobs(app.config['CHECKOUT_STALE_AFTER'])
+    if requeued:
+        logger.warning('Requeued %s stale checkout jobs', requeued)
+
+    threads = [
+        threading.Thread(target=worker_loop, args=(app, stop_event), name=f'checkout-worker-{i}', daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+    for thread in threads:
+        thread.join()
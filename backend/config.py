@@ -12,12 +12,90 @@ class Config:
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://", 1)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool (see dbpool.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 10)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))  # ms, 0 disables
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true'
+    # Connections this service's web workers may hold in total (0: the
+    # server's max_connections); checked when gunicorn starts
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS') or 0)
+    
+    # Read replicas (see replicas.py); comma-separated URLs, empty disables
+    DATABASE_REPLICA_URLS = [
+        url.strip().replace("postgres://", "postgresql://", 1)
+        for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    REPLICA_HEALTH_INTERVAL = int(os.environ.get('REPLICA_HEALTH_INTERVAL', 10))
+    REPLICA_RETRY_AFTER = int(os.environ.get('REPLICA_RETRY_AFTER', 30))
+    
+    # Password hashing
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    
+    # JSON (orjson is used when installed)
+    JSON_FAST_BACKEND = os.environ.get('JSON_FAST_BACKEND', 'true').lower() == 'true'
+    
+    # Response compression (brotli is used when installed)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # SQL instrumentation: slow-query log and N+1 detection (not for production)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'false').lower() == 'true'
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    # Serve /api/debug/queries outside debug mode (still requires a token)
+    QUERY_LOG_ENABLED = os.environ.get('QUERY_LOG_ENABLED', 'false').lower() == 'true'
+    
+    # Cache
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')  # memory (single process only), redis
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'dm')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 60))
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 5))
+    CACHE_LOCAL_MAXSIZE = int(os.environ.get('CACHE_LOCAL_MAXSIZE', 1024))
+    
+    # Catalog import (rows per bulk write)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    
+    # Order export (rows fetched per round trip while streaming)
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    
+    # Checkout
+    CHECKOUT_ASYNC = os.environ.get('CHECKOUT_ASYNC', 'false').lower() == 'true'
+    CHECKOUT_WORKERS = int(os.environ.get('CHECKOUT_WORKERS', 4))
+    CHECKOUT_BATCH_SIZE = int(os.environ.get('CHECKOUT_BATCH_SIZE', 20))
+    CHECKOUT_POLL_INTERVAL = float(os.environ.get('CHECKOUT_POLL_INTERVAL', 0.5))
+    CHECKOUT_MAX_ATTEMPTS = int(os.environ.get('CHECKOUT_MAX_ATTEMPTS', 3))
+    CHECKOUT_STALE_AFTER = int(os.environ.get('CHECKOUT_STALE_AFTER', 300))
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
     JWT_HEADER_TYPE = 'Bearer'
+    JWT_PROFILE_CLAIMS = os.environ.get('JWT_PROFILE_CLAIMS', 'false').lower() == 'true'
+    
+    # Principal cache (serialized users for authenticated endpoints)
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    PRINCIPAL_CACHE_MAXSIZE = int(os.environ.get('PRINCIPAL_CACHE_MAXSIZE', 4096))
+    
+    # Worker warmup before serving (see warmup.py)
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'true').lower() == 'true'
+    WARMUP_PATHS = os.environ.get(
+        'WARMUP_PATHS', '/api/products/categories,/api/products,/api/products?facets=true'
+    ).split(',')
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
@@ -27,13 +105,25 @@ class Config:
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'true').lower() == 'true'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:50000')
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
 
+class TestingConfig(Config):
+    TESTING = True
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    PASSWORD_HASH_WORKERS = 0
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    DATABASE_REPLICA_URLS = []
+
 class ProductionConfig(Config):
     DEBUG = False
+    # Several processes serve traffic, so the cache must be shared
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis')
 
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'production': ProductionConfig,
     'default': ProductionConfig
 }
\ No newline at end of file
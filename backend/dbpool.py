@@ -0,0 +1,131 @@
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Connection pool tuning and statistics. Pool settings come from the DB_*
+# config values; the pool records how long requests wait for a connection
+# so /api/health/db can show whether workers are starved.
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def stats(self):
+        with self._stats_lock:
+            checkouts = self._checkouts
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+
+        return {
+            'pool_size': self.size(),
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'max_overflow': self._max_overflow,
+            'checkouts': checkouts,
+            'avg_wait_ms': round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            'max_wait_ms': round(wait_max * 1000, 3)
+        }
+
+def engine_options(config):
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        return {}
+
+    url = make_url(uri)
+
+    # In-memory SQLite runs on a single shared connection (StaticPool)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+    if url.get_backend_name() == 'postgresql':
+        connect_args = {'connect_timeout': config['DB_CONNECT_TIMEOUT']}
+
+        if config['DB_PGBOUNCER']:
+            # Transaction pooling cannot keep server-side prepared statements
+            # or startup options; set statement_timeout on the role instead
+            if url.get_driver_name() == 'psycopg':
+                connect_args['prepare_threshold'] = None
+        elif config['DB_STATEMENT_TIMEOUT']:
+            connect_args['options'] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+
+        options['connect_args'] = connect_args
+
+    return options
+
+def init_app(app):
+    # Must run before db.init_app(); explicit SQLALCHEMY_ENGINE_OPTIONS win
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def pool_stats(engine):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {'status': pool.status()}
+
+def server_connection_limit(engine):
+    # Connections the server accepts from ordinary roles, or None if unknown
+    if engine.dialect.name != 'postgresql':
+        return None
+    with engine.connect() as connection:
+        total = int(connection.exec_driver_sql('SHOW max_connections').scalar())
+        reserved = int(connection.exec_driver_sql('SHOW superuser_reserved_connections').scalar())
+    return total - reserved
+
+def pool_size_for(concurrency, pool_size=5, max_overflow=10):
+    # (DB_POOL_SIZE, DB_MAX_OVERFLOW) for a process serving `concurrency`
+    # requests at once: it never holds more connections than that
+    size = min(pool_size, concurrency)
+    return size, min(max_overflow, concurrency - size)
+
+def check_connection_budget(config, engine, processes, concurrency=None):
+    # Every process has its own pool, so `processes` busy workers can hold
+    # processes x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections, or fewer
+    # when each serves only `concurrency` requests at once. Raises if that
+    # exceeds DB_MAX_CONNECTIONS or, without it, the server's own limit
+    # (skipped behind PgBouncer, whose limits apply instead). Returns
+    # (connections needed, limit or None).
+    per_process = config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW']
+    if concurrency:
+        per_process = min(per_process, concurrency)
+    needed = processes * per_process
+
+    limit = config.get('DB_MAX_CONNECTIONS')
+    if not limit and not config.get('DB_PGBOUNCER'):
+        limit = server_connection_limit(engine)
+
+    if limit and needed > limit:
+        raise RuntimeError(
+            f'{processes} workers x {per_process} connections (DB_POOL_SIZE {config["DB_POOL_SIZE"]} + '
+            f'DB_MAX_OVERFLOW {config["DB_MAX_OVERFLOW"]}, at most one per concurrent request) = {needed}, '
+            f'more than the {limit} available; lower WEB_CONCURRENCY or the pool settings, '
+            'or raise DB_MAX_CONNECTIONS'
+        )
+    return needed, limit
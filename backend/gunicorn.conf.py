@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import order_ids
+
+# gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app is loaded once in the master (preload_app) and forked into the
+# workers, so each worker drops the database connections and process pool
+# it inherited (post_fork) and warms up before accepting traffic
+# (post_worker_init). Each live worker also gets its own order id slot,
+# or leases a worker id when ORDER_ID_WORKER_ID is unset (see order_ids.py).
+#
+# Before forking, the master checks that the workers' connection pools fit
+# the database (see dbpool.check_connection_budget) and shares one password
+# hashing limit across all workers (see passwords.py).
+#
+# WEB_CONCURRENCY        worker processes (default 2 x CPUs + 1, at most
+#                        order_ids.MAX_WORKERS)
+# GUNICORN_WORKER_CLASS  gthread (default), gevent (pip install gevent) or sync
+# GUNICORN_THREADS       threads per gthread worker (default 4)
+# GUNICORN_WORKER_CONNECTIONS  concurrent requests per gevent worker
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(multiprocessing.cpu_count() * 2 + 1, order_ids.MAX_WORKERS))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = '-'
+
+if worker_class == 'gevent':
+    # Patch before the app (and its database driver) is imported by preload
+    from gevent import monkey
+    monkey.patch_all()
+
+# Workers share metrics through files; must be set before the app imports
+# prometheus_client
+if workers > 1 and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(tempfile.gettempdir(), 'prometheus-multiproc')
+
+def _concurrency():
+    # Requests one worker serves at once, i.e. how many connections it needs
+    if worker_class == 'gthread':
+        return threads
+    if worker_class == 'gevent':
+        return worker_connections
+    return 1
+
+# Unless set, size each worker's pool to the requests it serves at once
+# (gthread: one connection per thread) so the default worker count fits
+# the database's connection limit
+if not (os.environ.get('DB_POOL_SIZE') or os.environ.get('DB_MAX_OVERFLOW')):
+    import dbpool
+
+    pool_size, max_overflow = dbpool.pool_size_for(_concurrency())
+    os.environ['DB_POOL_SIZE'] = str(pool_size)
+    os.environ['DB_MAX_OVERFLOW'] = str(max_overflow)
+
+def on_starting(server):
+    from wsgi import app
+    from cache import cache
+    from models import db
+    from replicas import replicas
+    import dbpool
+    import passwords
+
+    # Invalidations in one worker would never reach the others
+    if workers > 1 and cache.process_local:
+        raise RuntimeError(
+            f'CACHE_BACKEND={app.config["CACHE_BACKEND"]} is per process; '
+            'use CACHE_BACKEND=redis (or CACHE_ENABLED=false) with more than one worker'
+        )
+    # With ORDER_ID_WORKER_ID each worker needs its own order id slot, also
+    # while a reload overlaps old and new workers; without it workers lease
+    # their ids from the database
+    if order_ids.uses_leases(app):
+        server.log.info('Order ids: worker ids leased from the database')
+    else:
+        if workers > order_ids.MAX_WORKERS:
+            raise RuntimeError(f'At most {order_ids.MAX_WORKERS} workers (order id slots); WEB_CONCURRENCY is {workers}')
+        order_ids.worker_id_for(0, required=order_ids.base_required(app))
+
+    # Nor would a writer's pin to the primary (read-your-writes)
+    if workers > 1 and replicas.enabled and not cache.shared:
+        raise RuntimeError('Read replicas with more than one worker need CACHE_BACKEND=redis')
+
+    # Every worker has its own pool; make sure they fit the database
+    with app.app_context():
+        needed, limit = dbpool.check_connection_budget(app.config, db.engine, workers, _concurrency())
+    server.log.info('Database connections: up to %s of %s', needed, limit or 'unknown')
+
+    passwords.share_across_workers(app.config['PASSWORD_HASH_WORKERS'])
+
+    # Start from an empty metrics directory so dead workers' samples vanish
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def pre_fork(server, worker):
+    from wsgi import app
+
+    # Give each live worker its own order id slot (see order_ids.py)
+    if order_ids.uses_leases(app):
+        return
+    taken = {getattr(other, 'order_id_slot', None) for other in server.WORKERS.values()}
+    worker.order_id_slot = order_ids.free_slot(taken)
+
+def post_fork(server, worker):
+    from wsgi import app
+    from models import db
+    from replicas import replicas
+    import passwords
+
+    # Connections opened by the master must not be shared across processes
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+        if order_ids.uses_leases(app):
+            order_ids.start_lease(db.engine)
+        else:
+            order_ids.configure(order_ids.worker_id_for(worker.order_id_slot, required=order_ids.base_required(app)))
+    replicas.dispose()
+    passwords.shutdown_executor()
+
+def post_worker_init(worker):
+    from wsgi import app
+    from warmup import warm_up
+
+    warm_up(app, connections=_concurrency())
+
+def worker_exit(server, worker):
+    # Hand a leased order id back right away instead of at expiry
+    order_ids.stop_lease()
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+def on_exit(server):
+    import passwords
+
+    passwords.discard_slots()
@@ -0,0 +1,91 @@
+import os
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+)
+import sqlhooks
+
+# Prometheus metrics. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an
+# empty directory before the workers start: every worker then writes its
+# samples there and /metrics aggregates them, whichever worker serves it.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests served',
+    ['method', 'endpoint', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+REQUEST_EXCEPTIONS = Counter(
+    'http_request_exceptions_total', 'Requests that ended in a server error',
+    ['endpoint']
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'SQL statements executed per request',
+    ['endpoint'], buckets=QUERY_COUNT_BUCKETS
+)
+DB_QUERY_TIME = Histogram(
+    'db_query_seconds_per_request', 'Time spent in SQL per request',
+    ['endpoint'], buckets=LATENCY_BUCKETS
+)
+ORDERS_CREATED = Counter(
+    'orders_created_total', 'Orders placed',
+    ['mode']
+)
+CHECKOUT_FAILURES = Counter(
+    'checkout_failures_total', 'Checkouts rejected or failed',
+    ['reason']
+)
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+def _record_statement(statement, elapsed):
+    g.db_query_count = g.get('db_query_count', 0) + 1
+    g.db_query_time = g.get('db_query_time', 0.0) + elapsed
+
+def registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return collector_registry
+    return REGISTRY
+
+def mark_process_dead(pid):
+    # gunicorn child_exit hook: drop the live gauges of a dead worker
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+def init_app(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    sqlhooks.on_statement(_record_statement)
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+
+        endpoint = _endpoint()
+        REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+        REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - start)
+        DB_QUERIES.labels(endpoint).observe(g.get('db_query_count', 0))
+        DB_QUERY_TIME.labels(endpoint).observe(g.get('db_query_time', 0.0))
+        if response.status_code >= 500:
+            REQUEST_EXCEPTIONS.labels(endpoint).inc()
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
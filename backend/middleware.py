@@ -0,0 +1,80 @@
+import gzip
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Conditional GET and response compression for every blueprint.
+#
+# Successful GET responses get a strong ETag computed from the body (and a
+# Last-Modified date when the view supplied one via set_last_modified), so
+# repeat requests can be answered with 304 Not Modified. Bodies above
+# COMPRESS_MIN_SIZE are then compressed with brotli or gzip according to
+# Accept-Encoding; compressed responses carry the weak form of the ETag,
+# which still matches If-None-Match.
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+
+def set_last_modified(value):
+    # Called by views that know when their resource last changed
+    if value is not None:
+        g.last_modified = value
+
+def _choose_encoding():
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+def init_app(app):
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESS_LEVEL', 6)
+
+    @app.after_request
+    def conditional_and_compress(response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+
+        # Streamed bodies (exports) are left untouched
+        if response.direct_passthrough or response.is_streamed:
+            return response
+
+        # Validators
+        if not response.get_etag()[0]:
+            response.add_etag()
+        last_modified = g.get('last_modified')
+        if last_modified is not None and response.last_modified is None:
+            response.last_modified = last_modified
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'no-cache'
+
+        response.make_conditional(request)
+        if response.status_code != 200:
+            return response
+
+        # Compression
+        response.vary.add('Accept-Encoding')
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        encoding = _choose_encoding()
+        if not encoding:
+            return response
+
+        response.set_data(_compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+
+        etag, is_weak = response.get_etag()
+        if etag and not is_weak:
+            response.set_etag(etag, weak=True)
+
+        return response
@@ -0,0 +1,48 @@
+"""Add indexes for hot query paths
+
+Revision ID: 3f1c2a9d7b40
+Revises: 
+Create Date: 2026-10-18 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7b40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# First revision: databases created with db.create_all() already have the
+# tables, so this only adds indexes, and skips any that already exist.
+# cart_items needs nothing new: unique_user_product_cart (user_id,
+# product_id) already serves lookups by user_id.
+INDEXES = [
+    ('ix_products_active_category', 'products', ['category', 'id'], {
+        'postgresql_where': sa.text('is_active'),
+        'sqlite_where': sa.text('is_active = 1')
+    }),
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], {}),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at'], {}),
+    ('ix_orders_created_at', 'orders', ['created_at'], {}),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], {}),
+]
+
+
+def upgrade():
+    # CONCURRENTLY on PostgreSQL so the tables stay writable while the
+    # indexes build; it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True, postgresql_concurrently=True, **options
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
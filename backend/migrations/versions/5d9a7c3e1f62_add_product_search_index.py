@@ -0,0 +1,53 @@
+"""Add product search index
+
+Revision ID: 5d9a7c3e1f62
+Revises: 8c5e2b71d4a3
+Create Date: 2026-10-18 22:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9a7c3e1f62'
+down_revision = '8c5e2b71d4a3'
+branch_labels = None
+depends_on = None
+
+# Full-text search (search.py): the GIN index on PostgreSQL, the FTS5
+# table on SQLite, filled from the existing products. Both are skipped if
+# db.create_all() already made them; other databases need neither.
+PG_VECTOR_SQL = "to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # CONCURRENTLY so products stay writable while the index builds
+        with op.get_context().autocommit_block():
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search '
+                f'ON products USING gin ({PG_VECTOR_SQL})'
+            )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts "
+            "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO products_fts (rowid, name, description) "
+            "SELECT id, name, coalesce(description, '') FROM products "
+            "WHERE id NOT IN (SELECT rowid FROM products_fts)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_products_search')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS products_fts')
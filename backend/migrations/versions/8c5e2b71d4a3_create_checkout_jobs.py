@@ -0,0 +1,48 @@
+"""Create checkout_jobs
+
+Revision ID: 8c5e2b71d4a3
+Revises: 3f1c2a9d7b40
+Create Date: 2026-10-18 21:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c5e2b71d4a3'
+down_revision = '3f1c2a9d7b40'
+branch_labels = None
+depends_on = None
+
+# Queue for async checkout (checkout_queue.py). Databases created with
+# db.create_all() after the model was added already have it, hence
+# if_not_exists.
+
+
+def upgrade():
+    op.create_table(
+        'checkout_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('order_number', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_checkout_jobs_order_number', 'checkout_jobs', ['order_number'], unique=True, if_not_exists=True)
+    op.create_index('ix_checkout_jobs_status_id', 'checkout_jobs', ['status', 'id'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_checkout_jobs_status_id', table_name='checkout_jobs', if_exists=True)
+    op.drop_index('ix_checkout_jobs_order_number', table_name='checkout_jobs', if_exists=True)
+    op.drop_table('checkout_jobs', if_exists=True)
@@ -0,0 +1,34 @@
+"""Create order_id_leases
+
+Revision ID: a47e0b9c2d15
+Revises: 5d9a7c3e1f62
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a47e0b9c2d15'
+down_revision = '5d9a7c3e1f62'
+branch_labels = None
+depends_on = None
+
+# Order number worker ids leased by processes of instances without
+# ORDER_ID_WORKER_ID (order_ids.py); skipped if db.create_all() made it.
+
+
+def upgrade():
+    op.create_table(
+        'order_id_leases',
+        sa.Column('worker_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('holder', sa.String(length=100), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('worker_id'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('order_id_leases', if_exists=True)
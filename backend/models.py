@@ -1,9 +1,13 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import validates
+from passwords import hash_password, check_password
+from replicas import RoutingSession
+from serializers import (
+    serialize_user, serialize_product, serialize_cart_item, serialize_order, serialize_order_item
+)
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -26,19 +30,13 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return check_password(self.password_hash, password)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return serialize_user(self)
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -58,17 +56,18 @@ class Product(db.Model):
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     
+    # Storefront listings and facets only ever read active products; queries
+    # must filter with Product.is_active == True (a literal) to match it
+    __table_args__ = (
+        db.Index(
+            'ix_products_active_category', 'category', 'id',
+            postgresql_where=db.text('is_active'),
+            sqlite_where=db.text('is_active = 1')
+        ),
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': float(self.price) if self.price else 0.0,
-            'category': self.category,
-            'image_url': self.image_url,
-            'stock_quantity': self.stock_quantity,
-            'is_active': self.is_active
-        }
+        return serialize_product(self)
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
@@ -90,14 +89,7 @@ class CartItem(db.Model):
         return quantity
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'product_id': self.product_id,
-            'quantity': self.quantity,
-            'product': self.product.to_dict() if self.product else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        return serialize_cart_item(self)
 
 class Order(db.Model):
     __tablename__ = 'orders'
@@ -118,40 +110,62 @@ class Order(db.Model):
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # A user's order history, admin listings by status, date-range exports
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),
+        db.Index('ix_orders_created_at', 'created_at'),
+    )
+    
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'order_number': self.order_number,
-            'total_amount': float(self.total_amount) if self.total_amount else 0.0,
-            'status': self.status,
-            'shipping_address': self.shipping_address,
-            'shipping_city': self.shipping_city,
-            'shipping_state': self.shipping_state,
-            'shipping_zip': self.shipping_zip,
-            'shipping_country': self.shipping_country,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'order_items': [item.to_dict() for item in self.order_items]
-        }
+        return serialize_order(self)
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     product_name = db.Column(db.String(200), nullable=False)
     product_price = db.Column(db.Numeric(10, 2), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    def to_dict(self):
+        return serialize_order_item(self)
+
+class CheckoutJob(db.Model):
+    __tablename__ = 'checkout_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    order_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
+    payload = db.Column(db.JSON, nullable=False)  # {'shipping': {...}, 'items': [{product_id, quantity}]}
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, processing, completed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_checkout_jobs_status_id', 'status', 'id'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
+            'order_number': self.order_number,
+            'status': self.status,
+            'error': self.error,
             'order_id': self.order_id,
-            'product_id': self.product_id,
-            'product_name': self.product_name,
-            'product_price': float(self.product_price) if self.product_price else 0.0,
-            'quantity': self.quantity,
-            'subtotal': float(self.product_price * self.quantity) if self.product_price else 0.0
-        }
\ No newline at end of file
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class OrderIdLease(db.Model):
+    # Order number worker ids leased by processes of instances without
+    # ORDER_ID_WORKER_ID (see order_ids.py)
+    __tablename__ = 'order_id_leases'
+    
+    worker_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
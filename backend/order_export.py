@@ -0,0 +1,175 @@
+import csv
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import select
+from models import db, Order, OrderItem, User
+from serializers import money, subtotal, isoformat
+
+# Streaming order export for accounting.
+#
+# One SELECT of orders joined with their items is read in chunks of
+# EXPORT_CHUNK_SIZE rows (a server-side cursor on PostgreSQL) and written
+# straight to the response, so memory use does not depend on how many
+# orders are exported. CSV has one line per order item; NDJSON has one
+# line per order with its items nested.
+
+order_export_bp = Blueprint('order_export', __name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+ORDER_COLUMNS = [
+    Order.id.label('order_id'),
+    Order.order_number,
+    Order.status,
+    Order.user_id,
+    User.email.label('user_email'),
+    Order.total_amount,
+    Order.shipping_address,
+    Order.shipping_city,
+    Order.shipping_state,
+    Order.shipping_zip,
+    Order.shipping_country,
+    Order.created_at
+]
+
+ITEM_COLUMNS = [
+    OrderItem.id.label('item_id'),
+    OrderItem.product_id,
+    OrderItem.product_name,
+    OrderItem.product_price,
+    OrderItem.quantity
+]
+
+CSV_HEADER = [column.key for column in ORDER_COLUMNS + ITEM_COLUMNS] + ['subtotal']
+
+class _Echo:
+    # File-like object for csv.writer that hands back each formatted line
+    def write(self, value):
+        return value
+
+def parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+
+def export_query(status=None, date_from=None, date_to=None):
+    # Ordered so that every order's items are adjacent
+    stmt = select(*ORDER_COLUMNS, *ITEM_COLUMNS).select_from(Order).join(
+        User, User.id == Order.user_id
+    ).outerjoin(
+        OrderItem, OrderItem.order_id == Order.id
+    ).order_by(Order.created_at, Order.id, OrderItem.id)
+
+    if status:
+        stmt = stmt.where(Order.status == status)
+    if date_from:
+        stmt = stmt.where(Order.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Order.created_at < date_to)
+
+    return stmt
+
+def _chunks(stmt, chunk_size):
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def generate_csv(stmt, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+
+    for rows in _chunks(stmt, chunk_size):
+        lines = []
+        for row in rows:
+            line = [_csv_value(value) for value in row]
+            line.append(row.product_price * row.quantity if row.item_id is not None else None)
+            lines.append(writer.writerow(line))
+        yield ''.join(lines)
+
+def _order_document(row):
+    return {
+        'id': row.order_id,
+        'order_number': row.order_number,
+        'status': row.status,
+        'user_id': row.user_id,
+        'user_email': row.user_email,
+        'total_amount': money(row.total_amount),
+        'shipping_address': row.shipping_address,
+        'shipping_city': row.shipping_city,
+        'shipping_state': row.shipping_state,
+        'shipping_zip': row.shipping_zip,
+        'shipping_country': row.shipping_country,
+        'created_at': isoformat(row.created_at),
+        'order_items': []
+    }
+
+def generate_ndjson(stmt, chunk_size):
+    dumps = current_app.json.dumps
+    order = None
+
+    for rows in _chunks(stmt, chunk_size):
+        lines = []
+        for row in rows:
+            if order is None or order['id'] != row.order_id:
+                if order is not None:
+                    lines.append(dumps(order) + '\n')
+                order = _order_document(row)
+
+            if row.item_id is not None:
+                order['order_items'].append({
+                    'id': row.item_id,
+                    'product_id': row.product_id,
+                    'product_name': row.product_name,
+                    'product_price': money(row.product_price),
+                    'quantity': row.quantity,
+                    'subtotal': subtotal(row.product_price, row.quantity)
+                })
+        if lines:
+            yield ''.join(lines)
+
+    if order is not None:
+        yield dumps(order) + '\n'
+
+# Admin endpoint: ?format=csv|ndjson&status=&from=&to= (to is exclusive)
+@order_export_bp.route('/api/admin/orders/export', methods=['GET'])
+def export_orders():
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        stmt = export_query(
+            request.args.get('status'),
+            parse_date(request.args.get('from'), 'from'),
+            parse_date(request.args.get('to'), 'to')
+        )
+        chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+        generate = generate_csv if export_format == 'csv' else generate_ndjson
+
+        filename = f"orders-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        return Response(
+            stream_with_context(generate(stmt, chunk_size)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-store'
+            }
+        )
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
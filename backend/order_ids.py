@@ -0,0 +1,302 @@
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+
+# Time-ordered order numbers: DM- followed by a 64-bit Snowflake-style id
+# in 13 Crockford base32 characters.
+#
+#   42 bits  milliseconds since EPOCH_MS
+#   10 bits  worker id (unique per generating process)
+#   12 bits  sequence within the millisecond
+#
+# Numbers from one process are strictly increasing, numbers from different
+# workers cannot collide, and all of them sort by creation time, so new
+# orders append to the end of the order_number index instead of landing on
+# random pages.
+#
+# Worker ids come from one of two sources:
+#
+# - ORDER_ID_WORKER_ID set: it is the base for this instance (a distinct
+#   multiple of SLOTS_PER_HOST, so up to 16 instances) and each process adds
+#   its slot. Under gunicorn every live worker gets a free slot (see
+#   gunicorn.conf.py); a reload briefly runs old and new workers side by
+#   side, hence at most MAX_WORKERS workers. A process outside gunicorn
+#   takes STANDALONE_SLOT. Slots never wrap: running out is an error.
+# - Unset (e.g. scaled instances sharing one environment): each process
+#   leases a worker id from the order_id_leases table for LEASE_SECONDS
+#   and renews it from a background thread. A process that could not renew
+#   in time stops handing out numbers rather than risk reusing an id that
+#   another process may have taken over. Do not mix the two within one
+#   deployment.
+#
+# Debug and testing fall back to a hostname-derived base instead of leasing.
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'DM-'
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+SLOTS_PER_HOST = 64
+STANDALONE_SLOT = SLOTS_PER_HOST - 1
+MAX_WORKERS = STANDALONE_SLOT // 2
+
+LEASE_SECONDS = 600
+LEASE_RENEW_SECONDS = 120
+CLOCK_SKEW_SECONDS = 60  # tolerated difference between instances' clocks
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32
+ENCODED_LENGTH = 13  # 65 bits, so every id has the same width and sorts as text
+
+def encode(value):
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+def decode(text):
+    value = 0
+    for char in text.upper():
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+class OrderIdGenerator:
+    def __init__(self, worker_id, epoch_ms=EPOCH_MS):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f'worker_id must be between 0 and {MAX_WORKER_ID}')
+        self.worker_id = worker_id
+        self.epoch_ms = epoch_ms
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_int(self):
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - self.epoch_ms
+
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting
+                # from the last timestamp so ids never repeat or decrease.
+                # A full sequence borrows the next millisecond.
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next(self):
+        return PREFIX + encode(self.next_int())
+
+def parse(order_number):
+    # (Unix time in ms, worker id, sequence) of a number made by this module
+    value = decode(order_number[len(PREFIX):])
+    return (
+        (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+        (value >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        value & MAX_SEQUENCE
+    )
+
+def host_base(required=True):
+    value = os.environ.get('ORDER_ID_WORKER_ID')
+    if value:
+        base = int(value)
+        if base % SLOTS_PER_HOST or not 0 <= base <= MAX_WORKER_ID:
+            raise ValueError(
+                f'ORDER_ID_WORKER_ID must be a multiple of {SLOTS_PER_HOST} between 0 and {MAX_WORKER_ID}'
+            )
+        return base
+    if required:
+        raise RuntimeError(f'ORDER_ID_WORKER_ID must be set (a distinct multiple of {SLOTS_PER_HOST} per instance)')
+
+    digest = hashlib.sha1(socket.gethostname().encode()).digest()
+    return int.from_bytes(digest[:4], 'big') % (MAX_WORKER_ID + 1) // SLOTS_PER_HOST * SLOTS_PER_HOST
+
+def worker_id_for(slot=None, required=True):
+    # slot defaults to STANDALONE_SLOT (a process outside gunicorn)
+    if slot is None:
+        slot = STANDALONE_SLOT
+    if not 0 <= slot < SLOTS_PER_HOST:
+        raise ValueError(f'Order id slot {slot} is outside 0..{SLOTS_PER_HOST - 1}')
+    return host_base(required) + slot
+
+def free_slot(taken):
+    # Lowest worker slot not in `taken` (gunicorn pre_fork)
+    for slot in range(STANDALONE_SLOT):
+        if slot not in taken:
+            return slot
+    raise RuntimeError(f'No free order id slot: more than {STANDALONE_SLOT} live workers')
+
+def base_required(app):
+    return not (app.debug or app.testing)
+
+def uses_leases(app):
+    return not os.environ.get('ORDER_ID_WORKER_ID') and base_required(app)
+
+def lease_worker_id(engine, holder):
+    # Lowest expired worker id, or the next one never leased; the
+    # conditional UPDATE and the primary key settle races between processes
+    from sqlalchemy import func, insert, select, update
+    from sqlalchemy.exc import IntegrityError
+    from models import OrderIdLease
+
+    leases = OrderIdLease.__table__
+    while True:
+        try:
+            with engine.begin() as connection:
+                now = datetime.utcnow()
+                values = {'holder': holder, 'expires_at': now + timedelta(seconds=LEASE_SECONDS)}
+
+                worker_id = connection.execute(
+                    select(func.min(leases.c.worker_id)).where(leases.c.expires_at < now)
+                ).scalar()
+                if worker_id is not None:
+                    taken = connection.execute(
+                        update(leases)
+                        .where(leases.c.worker_id == worker_id, leases.c.expires_at < now)
+                        .values(**values)
+                    ).rowcount
+                    if taken:
+                        return worker_id
+                    continue
+
+                worker_id = connection.execute(
+                    select(func.coalesce(func.max(leases.c.worker_id), -1) + 1)
+                ).scalar()
+                if worker_id > MAX_WORKER_ID:
+                    raise RuntimeError('Every order id worker id is leased')
+                connection.execute(insert(leases).values(worker_id=worker_id, **values))
+                return worker_id
+        except IntegrityError:
+            continue
+
+def renew_lease(engine, worker_id, holder):
+    # False if the lease was lost (it expired and another process took it)
+    from sqlalchemy import update
+    from models import OrderIdLease
+
+    leases = OrderIdLease.__table__
+    with engine.begin() as connection:
+        return connection.execute(
+            update(leases)
+            .where(leases.c.worker_id == worker_id, leases.c.holder == holder)
+            .values(expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+        ).rowcount == 1
+
+def release_lease(engine, worker_id, holder):
+    from sqlalchemy import update
+    from models import OrderIdLease
+
+    leases = OrderIdLease.__table__
+    with engine.begin() as connection:
+        connection.execute(
+            update(leases)
+            .where(leases.c.worker_id == worker_id, leases.c.holder == holder)
+            .values(expires_at=datetime.utcnow())
+        )
+
+_generator = None
+_generator_lock = threading.Lock()
+_standalone_lock = threading.Lock()
+_lease = None
+
+class _Lease:
+    # This process's leased worker id and the thread renewing it
+    def __init__(self, engine):
+        self.engine = engine
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stop_event = threading.Event()
+        self.worker_id = None
+        self.valid_until = 0.0
+
+    def acquire(self):
+        started = time.monotonic()
+        self.worker_id = lease_worker_id(self.engine, self.holder)
+        self._extend(started)
+        configure(self.worker_id)
+
+    def _extend(self, started):
+        # Measured from before the database call, minus the clock skew other
+        # instances may have when they judge the lease expired
+        self.valid_until = started + LEASE_SECONDS - CLOCK_SKEW_SECONDS
+
+    def renew(self):
+        started = time.monotonic()
+        if renew_lease(self.engine, self.worker_id, self.holder):
+            self._extend(started)
+        else:
+            logger.warning('Order id lease for worker id %s was lost; leasing another', self.worker_id)
+            self.acquire()
+
+    def run(self):
+        while not self.stop_event.wait(LEASE_RENEW_SECONDS):
+            try:
+                self.renew()
+            except Exception:
+                logger.exception('Renewing the order id lease failed')
+
+    def check(self):
+        if time.monotonic() > self.valid_until:
+            raise RuntimeError('Order id lease expired; refusing to hand out order numbers')
+
+def start_lease(engine):
+    # Leases a worker id for this process and keeps it renewed
+    global _lease
+
+    lease = _Lease(engine)
+    lease.acquire()
+    threading.Thread(target=lease.run, name='order-id-lease', daemon=True).start()
+    _lease = lease
+    return lease.worker_id
+
+def stop_lease():
+    # On worker exit, so the id can be reused without waiting for expiry
+    global _lease
+
+    lease, _lease = _lease, None
+    if lease is not None:
+        lease.stop_event.set()
+        try:
+            release_lease(lease.engine, lease.worker_id, lease.holder)
+        except Exception:
+            logger.exception('Releasing the order id lease failed; it expires on its own')
+
+def configure(worker_id):
+    # Called after fork with this process's worker id
+    global _generator
+    with _generator_lock:
+        _generator = OrderIdGenerator(worker_id)
+
+def _configure_standalone():
+    # A process outside gunicorn (CLI, shell); workers are set up in post_fork
+    with _standalone_lock:
+        if _generator is not None:
+            return
+        if has_app_context() and uses_leases(current_app):
+            from models import db
+            start_lease(db.engine)
+        else:
+            required = base_required(current_app) if has_app_context() else True
+            configure(worker_id_for(required=required))
+
+def generate_order_number():
+    if _generator is None:
+        _configure_standalone()
+
+    lease = _lease
+    if lease is not None:
+        lease.check()
+    return _generator.next()
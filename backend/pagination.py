@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import and_, or_
+
+# Keyset (cursor) pagination. Pages are fetched with a seek on the ordering
+# columns instead of OFFSET, so page latency stays flat however deep the
+# client scrolls. The cursor is an opaque token holding the ordering values
+# of the last row returned.
+
+MAX_PER_PAGE = 100
+
+class InvalidCursor(ValueError):
+    pass
+
+def clamp_per_page(per_page, maximum=MAX_PER_PAGE):
+    # Page sizes from query strings; 0, negative or huge values would break
+    # the page split or (on SQLite, LIMIT -1) disable the limit altogether
+    return min(max(per_page, 1), maximum)
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor('Invalid cursor')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        decoded.append(_decode_value(column, value))
+    return decoded
+
+def _decode_value(column, value):
+    # Only values of the column's own type reach the query
+    if value is None:
+        return value
+
+    python_type = column.type.python_type
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise InvalidCursor('Invalid cursor')
+
+    if isinstance(value, bool):
+        raise InvalidCursor('Invalid cursor')
+    if python_type in (float, Decimal) and isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, python_type):
+        raise InvalidCursor('Invalid cursor')
+    return value
+
+def _seek(columns, values, descending):
+    # (a, b) > (x, y)  ==>  a > x OR (a = x AND b > y)
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+def keyset_page(query, columns, cursor, per_page, descending=False):
+    # Returns (items, next_cursor); next_cursor is None on the last page
+    per_page = clamp_per_page(per_page)
+    if cursor:
+        query = query.filter(_seek(columns, decode_cursor(cursor, columns), descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    items = query.order_by(*ordering).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+
+    return items, next_cursor
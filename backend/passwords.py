@@ -0,0 +1,151 @@
+import fcntl
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing is capped at PASSWORD_HASH_WORKERS cores so a burst of
+# logins cannot saturate every request worker on the machine.
+#
+# A single process hashes in a small process pool, started on the first
+# login. Under gunicorn the master calls share_across_workers() before
+# forking: the workers then hash in their own process, at most
+# PASSWORD_HASH_WORKERS at a time across all of them, instead of each
+# starting a pool of its own. A hash holds a lock on one of
+# PASSWORD_HASH_WORKERS slot files; the kernel drops the lock when the
+# process dies, so a killed worker cannot leak a slot. Waiting longer than
+# PASSWORD_HASH_TIMEOUT raises HashingBusy (a 503). gevent workers hash in
+# gevent's thread pool so the event loop keeps serving meanwhile.
+# PASSWORD_HASH_WORKERS=0 hashes inline without a limit.
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+_executor = None
+_executor_lock = threading.Lock()
+_slot_paths = []
+_method_prefixes = {}
+
+def _setting(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+def _get_executor():
+    global _executor
+
+    workers = _setting('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded web worker is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def shutdown_executor():
+    # Call after fork so each worker process starts its own pool
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+class HashingBusy(Exception):
+    pass
+
+def share_across_workers(workers):
+    # gunicorn master, before forking: every worker inherits the slot files
+    global _slot_paths
+
+    _slot_paths = []
+    if workers:
+        directory = tempfile.mkdtemp(prefix='password-hashing-')
+        for slot in range(workers):
+            path = os.path.join(directory, str(slot))
+            open(path, 'w').close()
+            _slot_paths.append(path)
+    shutdown_executor()
+
+def discard_slots():
+    # gunicorn master, on exit
+    global _slot_paths
+
+    if _slot_paths:
+        shutil.rmtree(os.path.dirname(_slot_paths[0]), ignore_errors=True)
+    _slot_paths = []
+
+def _acquire_slot(timeout):
+    # Returns the descriptor holding a slot lock; closing it frees the slot
+    descriptors = [os.open(path, os.O_RDONLY) for path in _slot_paths]
+    deadline = time.monotonic() + timeout
+    try:
+        # Poll rather than block, so gevent workers keep serving while waiting
+        while True:
+            for descriptor in descriptors:
+                try:
+                    fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                descriptors.remove(descriptor)
+                return descriptor
+            if time.monotonic() >= deadline:
+                raise HashingBusy('Password hashing is busy')
+            time.sleep(0.005)
+    finally:
+        for descriptor in descriptors:
+            os.close(descriptor)
+
+def _off_event_loop(func, *args):
+    # A gevent worker serves all its requests on one OS thread, which a
+    # hash would hold for its whole duration
+    if 'gevent' in sys.modules:
+        from gevent import get_hub, monkey
+        if monkey.is_module_patched('threading'):
+            return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def _run_limited(func, *args):
+    descriptor = _acquire_slot(_setting('PASSWORD_HASH_TIMEOUT', 5))
+    try:
+        return _off_event_loop(func, *args)
+    finally:
+        os.close(descriptor)
+
+def _run(func, *args):
+    if _slot_paths:
+        return _run_limited(func, *args)
+
+    executor = _get_executor()
+    if executor is None:
+        return func(*args)
+    return executor.submit(func, *args).result()
+
+def hash_method():
+    return _setting('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+def hash_password(password):
+    return _run(generate_password_hash, password, hash_method())
+
+def check_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+def _method_prefix(method):
+    # Werkzeug fills in default parameters (e.g. 'pbkdf2' becomes
+    # 'pbkdf2:sha256:<iterations>'), so derive the stored prefix once
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+    return _method_prefixes[method]
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != _method_prefix(hash_method())
@@ -1,60 +1,167 @@
 from flask import Blueprint, request, jsonify
 from models import db, Product
-from sqlalchemy import or_
+from search import apply_search, index_product
+from pagination import keyset_page, clamp_per_page, InvalidCursor
+from cache import cache, MISSING
+from serializers import serialize_product, parse_fields, column_attributes, InvalidFields, PRODUCT_LIST_FIELDS
+from sqlalchemy import case, func
+from sqlalchemy.orm import load_only
+from middleware import set_last_modified
+from datetime import datetime
 
 products_bp = Blueprint('products', __name__)
 
+CATALOG_NAMESPACE = 'catalog'
+
+def product_cache_key(product_id):
+    return f'product:{product_id}'
+
+def invalidate_products(*product_ids):
+    # Drop cached detail pages for these products and every listing page
+    cache.delete(*[product_cache_key(product_id) for product_id in product_ids])
+    cache.bump(CATALOG_NAMESPACE)
+
+def _list_products(category, search, sort, cursor, page, per_page, include_total, fields):
+    serializer = serialize_product.only(fields)
+    
+    # Build query, loading only the columns the response needs
+    query = Product.query.options(
+        load_only(*column_attributes(Product, fields))
+    ).filter(Product.is_active == True)
+    
+    if category:
+        query = query.filter_by(category=category)
+    
+    rank = None
+    if search:
+        query, rank = apply_search(query, search)
+    
+    if sort == 'relevance' and rank is not None:
+        query = query.order_by(rank, Product.id)
+    
+    # Cursor pagination (opt-in with ?cursor=, empty for the first page)
+    if cursor is not None:
+        items, next_cursor = keyset_page(query, [Product.id], cursor, per_page)
+        
+        response = {
+            'products': serializer.many(items),
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }
+        if include_total:
+            response['total'] = query.order_by(None).count()
+        
+        return response
+    
+    # Pagination
+    paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return {
+        'products': serializer.many(paginated.items),
+        'total': paginated.total,
+        'page': paginated.page,
+        'per_page': paginated.per_page,
+        'pages': paginated.pages
+    }
+
+def category_facets(search=None):
+    # Per-category product and in-stock counts for the active catalog (or a
+    # search within it) in one GROUP BY. The category filter is deliberately
+    # not applied, so every category keeps its count while one is selected.
+    query = db.session.query(
+        Product.category,
+        func.count(Product.id),
+        func.sum(case((Product.stock_quantity > 0, 1), else_=0))
+    ).filter(Product.is_active == True)
+    
+    if search:
+        query, _ = apply_search(query, search)
+    
+    rows = query.group_by(Product.category).order_by(Product.category).all()
+    
+    return {
+        'categories': [
+            {'category': category, 'count': count, 'in_stock': int(in_stock or 0)}
+            for category, count, in_stock in rows
+        ]
+    }
+
 @products_bp.route('/api/products', methods=['GET'])
 def get_products():
     try:
         # Get query parameters
         category = request.args.get('category')
         search = request.args.get('search')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        sort = request.args.get('sort')
+        cursor = request.args.get('cursor')
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
+        include_total = request.args.get('count', 'false').lower() == 'true'
+        include_facets = request.args.get('facets', 'false').lower() == 'true'
+        fields = parse_fields(request.args.get('fields'), serialize_product, PRODUCT_LIST_FIELDS)
+        
+        if category == 'all':
+            category = None
         
-        # Build query
-        query = Product.query.filter_by(is_active=True)
+        if sort == 'relevance':
+            if not search:
+                return jsonify({'error': 'sort=relevance requires a search term'}), 400
+            if cursor is not None:
+                return jsonify({'error': 'Cursor pagination does not support sort=relevance'}), 400
         
-        if category and category != 'all':
-            query = query.filter_by(category=category)
+        def load():
+            return _list_products(category, search, sort, cursor, page, per_page, include_total, fields)
         
+        # Search results are not cached; browsing pages are keyed on their parameters
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(or_(
-                Product.name.ilike(search_term),
-                Product.description.ilike(search_term)
-            ))
+            response = load()
+        else:
+            key = cache.namespace_key(
+                CATALOG_NAMESPACE, 'products', category, cursor, page, per_page, include_total, ','.join(fields)
+            )
+            response = cache.cached(key, load)
         
-        # Pagination
-        paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Facets are cached on their own so every page and category shares them
+        if include_facets:
+            if search:
+                facets = category_facets(search)
+            else:
+                facets = cache.cached(cache.namespace_key(CATALOG_NAMESPACE, 'facets'), category_facets)
+            response = {**response, 'facets': facets}
         
-        products = [product.to_dict() for product in paginated.items]
-        
-        return jsonify({
-            'products': products,
-            'total': paginated.total,
-            'page': paginated.page,
-            'per_page': paginated.per_page,
-            'pages': paginated.pages
-        }), 200
+        return jsonify(response), 200
         
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/api/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     try:
-        product = Product.query.get(product_id)
+        key = product_cache_key(product_id)
+        entry = cache.get(key)
         
-        if not product:
-            return jsonify({'error': 'Product not found'}), 404
+        if entry is MISSING:
+            product = Product.query.get(product_id)
+            
+            if not product:
+                return jsonify({'error': 'Product not found'}), 404
+            
+            if not product.is_active:
+                return jsonify({'error': 'Product is not available'}), 404
+            
+            entry = {
+                'product': product.to_dict(),
+                'updated_at': product.updated_at.isoformat() if product.updated_at else None
+            }
+            cache.set(key, entry)
         
-        if not product.is_active:
-            return jsonify({'error': 'Product is not available'}), 404
+        if entry['updated_at']:
+            set_last_modified(datetime.fromisoformat(entry['updated_at']))
         
         return jsonify({
-            'product': product.to_dict()
+            'product': entry['product']
         }), 200
         
     except Exception as e:
@@ -63,8 +170,12 @@ def get_product(product_id):
 @products_bp.route('/api/products/categories', methods=['GET'])
 def get_categories():
     try:
-        categories = db.session.query(Product.category).distinct().filter_by(is_active=True).all()
-        category_list = [cat[0] for cat in categories if cat[0]]
+        def load():
+            categories = db.session.query(Product.category).distinct().filter(Product.is_active == True).all()
+            return [cat[0] for cat in categories if cat[0]]
+        
+        key = cache.namespace_key(CATALOG_NAMESPACE, 'categories')
+        category_list = cache.cached(key, load)
         
         return jsonify({
             'categories': category_list
@@ -95,8 +206,12 @@ def create_product():
         )
         
         db.session.add(product)
+        db.session.flush()  # Get product ID
+        index_product(product)
         db.session.commit()
         
+        invalidate_products(product.id)
+        
         return jsonify({
             'message': 'Product created successfully',
             'product': product.to_dict()
@@ -131,8 +246,13 @@ def update_product(product_id):
         if 'is_active' in data:
             product.is_active = data['is_active']
         
+        if 'name' in data or 'description' in data:
+            index_product(product)
+        
         db.session.commit()
         
+        invalidate_products(product.id)
+        
         return jsonify({
             'message': 'Product updated successfully',
             'product': product.to_dict()
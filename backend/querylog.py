@@ -0,0 +1,129 @@
+import logging
+import threading
+from collections import Counter
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import jwt_required
+import sqlhooks
+
+# Development/staging SQL instrumentation (SQL_INSTRUMENTATION=true).
+#
+# Every statement run while serving a request is timed. Statements slower
+# than SLOW_QUERY_MS are logged with the route that issued them, and a
+# statement repeated N_PLUS_ONE_THRESHOLD or more times within one request
+# (same SQL, different parameters) is flagged as a probable N+1. Totals per
+# endpoint are kept in memory and served, to authenticated users, from
+# /api/debug/queries in debug mode or with QUERY_LOG_ENABLED=true.
+
+logger = logging.getLogger(__name__)
+
+class QueryReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, statements, total_time, slow, repeated):
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'total_ms': 0.0,
+                'slow_queries': 0,
+                'n_plus_one': Counter()
+            })
+            entry['requests'] += 1
+            entry['queries'] += statements
+            entry['max_queries'] = max(entry['max_queries'], statements)
+            entry['total_ms'] += total_time * 1000
+            entry['slow_queries'] += slow
+            for statement in repeated:
+                entry['n_plus_one'][statement] += 1
+
+    def summary(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': entry['requests'],
+                    'avg_queries': round(entry['queries'] / entry['requests'], 2),
+                    'max_queries': entry['max_queries'],
+                    'avg_query_ms': round(entry['total_ms'] / entry['requests'], 3),
+                    'slow_queries': entry['slow_queries'],
+                    'n_plus_one': [
+                        {'statement': statement, 'requests': hits}
+                        for statement, hits in entry['n_plus_one'].most_common()
+                    ]
+                }
+                for endpoint, entry in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+report = QueryReport()
+
+def _record_statement(statement, elapsed):
+    settings = current_app.extensions.get('querylog')
+    if settings is None:
+        return
+
+    if 'querylog_statements' not in g:
+        g.querylog_statements = Counter()
+        g.querylog_time = 0.0
+        g.querylog_slow = 0
+    g.querylog_statements[statement] += 1
+    g.querylog_time += elapsed
+
+    if elapsed * 1000 >= settings['slow_query_ms']:
+        g.querylog_slow += 1
+        logger.warning(
+            'Slow query (%.1fms) on %s %s: %s',
+            elapsed * 1000, request.method, request.path, statement
+        )
+
+def init_app(app):
+    if not app.config.get('SQL_INSTRUMENTATION', False):
+        return
+
+    app.extensions['querylog'] = {
+        'slow_query_ms': app.config.get('SLOW_QUERY_MS', 100),
+        'n_plus_one_threshold': app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+    }
+
+    sqlhooks.on_statement(_record_statement)
+
+    @app.after_request
+    def summarize_queries(response):
+        statements = g.pop('querylog_statements', None)
+        if statements is None:
+            return response
+
+        endpoint = request.endpoint or 'unmatched'
+        threshold = app.extensions['querylog']['n_plus_one_threshold']
+        repeated = [statement for statement, count in statements.items() if count >= threshold]
+
+        for statement in repeated:
+            logger.warning(
+                'Probable N+1 on %s: statement ran %d times: %s',
+                endpoint, statements[statement], statement
+            )
+
+        report.record(
+            endpoint,
+            sum(statements.values()),
+            g.pop('querylog_time', 0.0),
+            g.pop('querylog_slow', 0),
+            repeated
+        )
+        return response
+
+    # The report exposes SQL, so it is only served where asked for
+    if not (app.debug or app.config.get('QUERY_LOG_ENABLED', False)):
+        return
+
+    @app.route('/api/debug/queries', methods=['GET', 'DELETE'])
+    @jwt_required()
+    def query_report():
+        if request.method == 'DELETE':
+            report.reset()
+        return jsonify({'endpoints': report.summary()}), 200
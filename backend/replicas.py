@@ -0,0 +1,155 @@
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+from cache import cache
+
+# Read-replica routing.
+#
+# With DATABASE_REPLICA_URLS set, the session sends queries made while
+# serving GET/HEAD requests to a replica (round-robin, skipping replicas
+# that fail a health check) and everything else to the primary. A user
+# whose request wrote to the primary is pinned to the primary for
+# REPLICA_STICKY_SECONDS so they read their own writes (e.g. the order
+# list right after checkout). Views can opt out with @use_primary. A
+# request reads from one replica throughout, so a page and its count (or
+# its selectinload) never see different replication lag.
+#
+# The pin is a flag in the cache backend, so every process must share it:
+# with more than one worker gunicorn.conf.py refuses to start replicas
+# unless the backend is redis (the flag works with CACHE_ENABLED=false).
+
+logger = logging.getLogger(__name__)
+
+class ReplicaSet:
+    def __init__(self):
+        self.engines = []
+        self.sticky_seconds = 5
+        self.health_interval = 10
+        self.retry_after = 30
+        self._rotation = itertools.count()
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        self._down_until = {}
+
+    @property
+    def enabled(self):
+        return bool(self.engines)
+
+    def init_app(self, app):
+        import dbpool
+
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        self.health_interval = app.config.get('REPLICA_HEALTH_INTERVAL', 10)
+        self.retry_after = app.config.get('REPLICA_RETRY_AFTER', 30)
+        self.engines = [
+            create_engine(url, **dbpool.engine_options({**app.config, 'SQLALCHEMY_DATABASE_URI': url}))
+            for url in app.config.get('DATABASE_REPLICA_URLS', [])
+        ]
+        self._checked_at = {}
+        self._down_until = {}
+
+        if not self.engines:
+            return
+
+        @app.after_request
+        def pin_writers_to_primary(response):
+            if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+                user_id = _current_user_id()
+                if user_id is not None:
+                    cache.set_flag(f'rw:{user_id}', self.sticky_seconds)
+            return response
+
+    def dispose(self):
+        # After fork, so workers do not share the parent's connections
+        for engine in self.engines:
+            engine.dispose(close=False)
+
+    def _healthy(self, engine):
+        # The last known state, re-probed at most every health_interval by
+        # the one thread that finds it due. The probe runs outside the lock,
+        # so a slow replica only delays that thread; the others keep using
+        # the cached state meanwhile.
+        now = time.monotonic()
+        with self._lock:
+            if self._down_until.get(engine, 0) > now:
+                return False
+            if now - self._checked_at.get(engine, 0) < self.health_interval:
+                return True
+            self._checked_at[engine] = now
+
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except Exception:
+            logger.warning('Replica %s failed its health check', engine.url.render_as_string())
+            with self._lock:
+                self._down_until[engine] = time.monotonic() + self.retry_after
+            return False
+
+    def choose(self):
+        # Next healthy replica, or None to fall back to the primary
+        with self._lock:
+            start = next(self._rotation)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self._healthy(engine):
+                return engine
+        return None
+
+replicas = ReplicaSet()
+
+def _current_user_id():
+    # Public views never verify the token, so do it here; a bad token just
+    # means no user (protected views still reject it themselves)
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+def use_primary(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_route = 'primary'
+        return view(*args, **kwargs)
+    return wrapper
+
+def _route():
+    # Decided once per request, on the first query
+    route = g.get('db_route')
+    if route is None:
+        route = 'primary'
+        if request.method in ('GET', 'HEAD'):
+            user_id = _current_user_id()
+            if user_id is None or not cache.has_flag(f'rw:{user_id}'):
+                route = 'replica'
+        g.db_route = route
+    return route
+
+def _replica():
+    # Chosen once per request, None meaning the primary
+    if 'db_replica' not in g:
+        g.db_replica = replicas.choose()
+    return g.db_replica
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and replicas.enabled
+            and has_request_context()
+            and not self._flushing
+            and not (self.new or self.dirty or self.deleted)
+            and _route() == 'replica'
+        ):
+            engine = _replica()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
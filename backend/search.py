@@ -0,0 +1,129 @@
+import re
+from sqlalchemy import DDL, bindparam, event, false, func, literal_column, or_, table, column
+from models import db, Product
+
+# Full-text search for the product catalog.
+#
+# PostgreSQL: a GIN index over a tsvector expression. The server keeps the
+# index up to date on every write, so no application-side sync is needed.
+# SQLite: an FTS5 virtual table keyed by product id, kept in sync by
+# index_product() from the product write paths.
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+PG_VECTOR_SQL = "to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+products_fts = table(
+    'products_fts',
+    column('rowid'),
+    column('name'),
+    column('description'),
+    column('rank')
+)
+
+create_pg_index = DDL(
+    f'CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin ({PG_VECTOR_SQL})'
+)
+create_sqlite_fts = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts "
+    "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+)
+drop_sqlite_fts = DDL('DROP TABLE IF EXISTS products_fts')
+
+# Created alongside the products table by db.create_all()
+event.listen(Product.__table__, 'after_create', create_pg_index.execute_if(dialect='postgresql'))
+event.listen(Product.__table__, 'after_create', create_sqlite_fts.execute_if(dialect='sqlite'))
+event.listen(Product.__table__, 'before_drop', drop_sqlite_fts.execute_if(dialect='sqlite'))
+
+def include_in_migrations(obj, name, type_, reflected, compare_to):
+    # Keep autogenerate from dropping the search index and FTS tables, which
+    # are created by the DDL hooks above rather than declared on the models
+    if type_ == 'table' and name.startswith('products_fts'):
+        return False
+    if type_ == 'index' and name == 'ix_products_search':
+        return False
+    return True
+
+def _dialect():
+    return db.engine.dialect.name
+
+def _pg_vector():
+    english = literal_column("'english'::regconfig")
+    empty = literal_column("''")
+    document = func.coalesce(Product.name, empty).op('||')(literal_column("' '")).op('||')(
+        func.coalesce(Product.description, empty)
+    )
+    return func.to_tsvector(english, document)
+
+def tokenize(term):
+    return TOKEN_RE.findall(term.lower())
+
+def apply_search(query, term):
+    # Returns the filtered query and a rank expression usable in ORDER BY
+    # (ascending order puts the best match first), or None if the backend
+    # cannot rank.
+    tokens = tokenize(term)
+    if not tokens:
+        return query.filter(false()), None
+
+    dialect = _dialect()
+
+    if dialect == 'postgresql':
+        tsquery = func.to_tsquery(
+            literal_column("'english'::regconfig"),
+            ' & '.join(f'{token}:*' for token in tokens)
+        )
+        vector = _pg_vector()
+        query = query.filter(vector.op('@@')(tsquery))
+        return query, -func.ts_rank(vector, tsquery)
+
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        query = query.join(products_fts, products_fts.c.rowid == Product.id).filter(
+            literal_column('products_fts').op('MATCH')(match)
+        )
+        return query, products_fts.c.rank
+
+    search_term = f"%{term}%"
+    query = query.filter(or_(
+        Product.name.ilike(search_term),
+        Product.description.ilike(search_term)
+    ))
+    return query, None
+
+def index_product(product):
+    # Must be called after the product has been flushed (so it has an id)
+    index_products([(product.id, product.name, product.description)])
+
+def index_products(rows):
+    # Bulk form of index_product() for (id, name, description) rows
+    if _dialect() != 'sqlite':
+        return
+
+    rows = [
+        {'rowid': product_id, 'name': name, 'description': description or ''}
+        for product_id, name, description in rows
+    ]
+    if not rows:
+        return
+
+    db.session.execute(
+        products_fts.delete().where(products_fts.c.rowid == bindparam('product_id')),
+        [{'product_id': row['rowid']} for row in rows]
+    )
+    db.session.execute(products_fts.insert(), rows)
+
+def rebuild_index():
+    dialect = _dialect()
+
+    if dialect == 'postgresql':
+        db.session.execute(create_pg_index)
+    elif dialect == 'sqlite':
+        db.session.execute(create_sqlite_fts)
+        db.session.execute(products_fts.delete())
+        db.session.execute(products_fts.insert().from_select(
+            ['rowid', 'name', 'description'],
+            db.select(Product.id, Product.name, func.coalesce(Product.description, ''))
+        ))
+
+    db.session.commit()
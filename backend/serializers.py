@@ -0,0 +1,186 @@
+import threading
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Per-model serializers compiled once into plain functions, so turning a
+# page of rows into dicts costs one dict literal per row instead of a
+# chain of method calls and conditionals.
+
+def money(value):
+    return float(value) if value else 0.0
+
+def subtotal(price, quantity):
+    return float(price * quantity) if price else 0.0
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+HELPERS = {
+    'money': money,
+    'subtotal': subtotal,
+    'isoformat': isoformat
+}
+
+class Serializer:
+    def __init__(self, name, fields):
+        # fields maps output keys to Python expressions over `obj`
+        self.name = name
+        self.fields = fields
+        self._variants = {}
+        self._lock = threading.Lock()
+        self._serialize = self._compile(tuple(fields))
+
+    def _compile(self, keys):
+        body = ',\n        '.join(f'{key!r}: {self.fields[key]}' for key in keys)
+        source = f'def serialize_{self.name}(obj):\n    return {{\n        {body}\n    }}\n'
+        namespace = dict(HELPERS)
+        namespace.update(SERIALIZERS)
+        exec(compile(source, f'<serializer {self.name}>', 'exec'), namespace)
+        return namespace[f'serialize_{self.name}']
+
+    def __call__(self, obj):
+        return self._serialize(obj)
+
+    def many(self, objs):
+        serialize = self._serialize
+        return [serialize(obj) for obj in objs]
+
+    def only(self, keys):
+        # Serializer restricted to a subset of fields, compiled on first use
+        keys = tuple(key for key in self.fields if key in keys)
+        variant = self._variants.get(keys)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(keys)
+                if variant is None:
+                    variant = Serializer(self.name, {key: self.fields[key] for key in keys})
+                    self._variants[keys] = variant
+        return variant
+
+SERIALIZERS = {}
+
+def register(name, fields):
+    serializer = Serializer(name, fields)
+    SERIALIZERS[f'serialize_{name}'] = serializer._serialize
+    return serializer
+
+serialize_user = register('user', {
+    'id': 'obj.id',
+    'email': 'obj.email',
+    'first_name': 'obj.first_name',
+    'last_name': 'obj.last_name',
+    'created_at': 'isoformat(obj.created_at)'
+})
+
+serialize_product = register('product', {
+    'id': 'obj.id',
+    'name': 'obj.name',
+    'description': 'obj.description',
+    'price': 'money(obj.price)',
+    'category': 'obj.category',
+    'image_url': 'obj.image_url',
+    'stock_quantity': 'obj.stock_quantity',
+    'is_active': 'obj.is_active'
+})
+
+# List views skip the (potentially large) description unless asked for it
+PRODUCT_LIST_FIELDS = tuple(key for key in serialize_product.fields if key != 'description')
+
+serialize_cart_item = register('cart_item', {
+    'id': 'obj.id',
+    'user_id': 'obj.user_id',
+    'product_id': 'obj.product_id',
+    'quantity': 'obj.quantity',
+    'product': 'serialize_product(obj.product) if obj.product else None',
+    'created_at': 'isoformat(obj.created_at)'
+})
+
+serialize_order_item = register('order_item', {
+    'id': 'obj.id',
+    'order_id': 'obj.order_id',
+    'product_id': 'obj.product_id',
+    'product_name': 'obj.product_name',
+    'product_price': 'money(obj.product_price)',
+    'quantity': 'obj.quantity',
+    'subtotal': 'subtotal(obj.product_price, obj.quantity)'
+})
+
+serialize_order = register('order', {
+    'id': 'obj.id',
+    'user_id': 'obj.user_id',
+    'order_number': 'obj.order_number',
+    'total_amount': 'money(obj.total_amount)',
+    'status': 'obj.status',
+    'shipping_address': 'obj.shipping_address',
+    'shipping_city': 'obj.shipping_city',
+    'shipping_state': 'obj.shipping_state',
+    'shipping_zip': 'obj.shipping_zip',
+    'shipping_country': 'obj.shipping_country',
+    'created_at': 'isoformat(obj.created_at)',
+    'order_items': '[serialize_order_item(item) for item in obj.order_items]'
+})
+
+# Order history rows from checkout.order_summaries (no line items)
+serialize_order_summary = register('order_summary', {
+    'id': 'obj.id',
+    'order_number': 'obj.order_number',
+    'status': 'obj.status',
+    'total_amount': 'money(obj.total_amount)',
+    'item_count': 'obj.item_count',
+    'thumbnail_url': 'obj.thumbnail_url',
+    'created_at': 'isoformat(obj.created_at)'
+})
+
+# Sparse fieldsets (?fields=a,b,c) for listing endpoints
+
+class InvalidFields(ValueError):
+    pass
+
+def parse_fields(value, serializer, default=None):
+    # Returns field names in serializer order; id is always included
+    if not value:
+        return tuple(default or serializer.fields)
+    
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(serializer.fields)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    requested.add('id')
+    return tuple(key for key in serializer.fields if key in requested)
+
+def column_attributes(model, fields, always=()):
+    # Mapped columns backing the given fields, for load_only()
+    columns = model.__table__.columns
+    return [getattr(model, name) for name in dict.fromkeys((*always, *fields)) if name in columns]
+
+class ORJSONProvider(DefaultJSONProvider):
+    # Same output as the default provider (sorted keys, HTTP dates,
+    # indentation in debug), encoded by orjson. Non-ASCII text is written
+    # as UTF-8 instead of \u escapes.
+
+    def _option(self, pretty=False):
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default, option=self._option(pretty)) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def init_app(app):
+    if orjson is not None and app.config.get('JSON_FAST_BACKEND', True):
+        app.json = ORJSONProvider(app)
@@ -0,0 +1,34 @@
+import time
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# One pair of cursor-execute listeners on every engine (primary and
+# replicas), shared by request metrics and the query log. Each registers a
+# callback that receives (statement, elapsed seconds) for every statement
+# run while serving a request.
+
+_callbacks = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('statement_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    starts = conn.info.get('statement_start')
+    if not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    for callback in _callbacks:
+        callback(statement, elapsed)
+
+def on_statement(callback):
+    if callback not in _callbacks:
+        _callbacks.append(callback)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
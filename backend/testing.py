@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Helpers for tests and benchmarks that need to reason about the number of
+# SQL statements an endpoint issues.
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCounter:
+    # Counts statements on every engine (primary and replicas) unless one
+    # engine is given
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else Engine
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
+
+@contextmanager
+def query_budget(max_queries, engine=None):
+    # Fails if the enclosed block runs more than max_queries statements:
+    #
+    #     with app.app_context(), query_budget(3):
+    #         client.get('/api/orders', headers=headers)
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > max_queries:
+        statements = '\n'.join(f'  {statement}' for statement in counter.statements)
+        raise QueryBudgetExceeded(
+            f'{counter.count} queries executed, budget was {max_queries}:\n{statements}'
+        )
+
+class ThreadQueryCounter:
+    # Per-thread statement counts for concurrent runs (e.g. load tests),
+    # where one shared QueryCounter would mix up requests:
+    #
+    #     with ThreadQueryCounter() as counter:
+    #         client.get('/api/products')
+    #         queries = counter.take()
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else Engine
+        self._local = threading.local()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def take(self):
+        # Statements run by the calling thread since its last take()
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
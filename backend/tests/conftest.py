@@ -0,0 +1,52 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from cache import cache, MemoryBackend
+from models import db, Product, User
+
+# Every test runs against a fresh in-memory SQLite database and an empty
+# cache; the app itself is created once per session.
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+@pytest.fixture(autouse=True)
+def database(app):
+    cache.backend = MemoryBackend()
+    cache.local.clear()
+
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(database):
+    # Tests authenticate with minted tokens, so no password is hashed
+    user = User(email='shopper@example.com', first_name='Test', last_name='Shopper', password_hash='!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+@pytest.fixture
+def products(database):
+    items = [
+        Product(
+            name=f'Product {i}', price=10 + i, category='Jackets' if i % 2 else 'Shirts',
+            image_url=f'/images/{i}.png', stock_quantity=10
+        )
+        for i in range(30)
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
@@ -0,0 +1,70 @@
+import pytest
+from models import db, CartItem
+from catalog_import import import_products
+
+# Every write path must invalidate what the catalog endpoints cached:
+# product detail, list pages, facets and categories.
+
+SHIPPING = {
+    'shipping_address': '1 Test Street',
+    'shipping_city': 'Colombo',
+    'shipping_state': 'Western',
+    'shipping_zip': '00100',
+    'shipping_country': 'Sri Lanka'
+}
+
+def catalog(client, product_id):
+    # Reads (and so caches) the detail, list, facet and category responses
+    detail = client.get(f'/api/products/{product_id}').get_json()['product']
+    listing = client.get('/api/products?per_page=100&facets=true').get_json()
+    categories = client.get('/api/products/categories').get_json()['categories']
+    listed = {product['id']: product for product in listing['products']}
+    facets = {facet['category']: facet for facet in listing['facets']['categories']}
+    return detail, listed, facets, sorted(categories)
+
+@pytest.fixture
+def cached_catalog(client, products):
+    catalog(client, products[0].id)
+
+def test_product_update_invalidates(client, products, cached_catalog):
+    response = client.put(f'/api/admin/products/{products[0].id}', json={'name': 'Renamed', 'category': 'Hats'})
+    assert response.status_code == 200
+
+    detail, listed, facets, categories = catalog(client, products[0].id)
+    assert detail['name'] == listed[products[0].id]['name'] == 'Renamed'
+    assert facets['Hats']['count'] == 1
+    assert 'Hats' in categories
+
+def test_product_create_invalidates(client, products, cached_catalog):
+    response = client.post('/api/admin/products', json={'name': 'Bucket Hat', 'price': 25, 'category': 'Hats'})
+    product_id = response.get_json()['product']['id']
+
+    detail, listed, facets, categories = catalog(client, product_id)
+    assert listed[product_id]['name'] == 'Bucket Hat'
+    assert facets['Hats']['count'] == 1
+    assert categories == ['Hats', 'Jackets', 'Shirts']
+
+def test_catalog_import_invalidates(client, products, cached_catalog):
+    report = import_products(enumerate([
+        {'id': products[0].id, 'name': 'Imported', 'price': '12.00', 'category': 'Hats', 'stock_quantity': '4'},
+        {'name': 'New Import', 'price': '9.00', 'category': 'Hats'}
+    ], start=2))
+    assert report.imported == 2
+
+    detail, listed, facets, categories = catalog(client, products[0].id)
+    assert detail['name'] == listed[products[0].id]['name'] == 'Imported'
+    assert detail['stock_quantity'] == 4
+    assert facets['Hats']['count'] == 2
+    assert 'Hats' in categories
+
+def test_checkout_invalidates(client, auth_headers, user, products, cached_catalog):
+    # Sells out the product
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=10))
+    db.session.commit()
+    in_stock = catalog(client, products[0].id)[2][products[0].category]['in_stock']
+
+    assert client.post('/api/checkout', json=SHIPPING, headers=auth_headers).status_code == 201
+
+    detail, listed, facets, categories = catalog(client, products[0].id)
+    assert detail['stock_quantity'] == listed[products[0].id]['stock_quantity'] == 0
+    assert facets[products[0].category]['in_stock'] == in_stock - 1
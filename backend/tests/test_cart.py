@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+from models import db, CartItem
+from cart import merge_cart_items
+
+@pytest.mark.parametrize('product_id', [[1], '1', 0, -3, 1.5, True, {'id': 1}])
+def test_batch_rejects_invalid_product_ids(client, auth_headers, products, product_id):
+    response = client.post('/api/cart/batch', json={'items': [{'product_id': product_id}]}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Product ID must be a positive integer'
+
+@pytest.mark.parametrize('quantity', [0, -1, '2', True])
+def test_batch_rejects_invalid_quantities(client, auth_headers, products, quantity):
+    response = client.post(
+        '/api/cart/batch', json={'items': [{'product_id': products[0].id, 'quantity': quantity}]}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_batch_adds_to_existing_lines(client, auth_headers, user, products):
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=1))
+    db.session.commit()
+
+    response = client.post('/api/cart/batch', json={'items': [
+        {'product_id': products[0].id, 'quantity': 2},
+        {'product_id': products[1].id},
+        {'product_id': products[0].id}
+    ]}, headers=auth_headers)
+    assert response.status_code == 200
+
+    quantities = {item['product_id']: item['quantity'] for item in response.get_json()['cart_items']}
+    assert quantities == {products[0].id: 4, products[1].id: 1}
+
+def test_merge_fallback_matches_upsert(user, products):
+    db.session.add(CartItem(user_id=user.id, product_id=products[0].id, quantity=1))
+    db.session.commit()
+
+    now = datetime.utcnow()
+    merge_cart_items([
+        {'user_id': user.id, 'product_id': product.id, 'quantity': 2, 'created_at': now, 'updated_at': now}
+        for product in products[:2]
+    ])
+    db.session.commit()
+
+    assert {item.product_id: item.quantity for item in CartItem.query.all()} == {
+        products[0].id: 3, products[1].id: 2
+    }
@@ -0,0 +1,49 @@
+from datetime import datetime
+from models import db, Product
+import catalog_import
+from catalog_import import import_products, validate_row, _write_generic
+
+def record(**fields):
+    return {'name': 'Linen Shirt', 'price': '45.00', 'category': 'Shirts', **fields}
+
+def test_import_upserts_by_id(products):
+    report = import_products(enumerate([
+        record(id=products[0].id, name='Renamed', stock_quantity='3'),
+        record(name='New Shirt'),
+        record(price='free')
+    ], start=2))
+
+    assert (report.processed, report.imported, report.failed) == (3, 2, 1)
+    assert db.session.get(Product, products[0].id).name == 'Renamed'
+    assert Product.query.filter_by(name='New Shirt').count() == 1
+
+def test_generic_writer_updates_and_inserts(products):
+    rows = [
+        validate_row(record(id=products[0].id, name='Renamed', stock_quantity='3')),
+        validate_row(record(id=500, name='Feed Id')),
+        validate_row(record(name='New Shirt'))
+    ]
+
+    product_ids = _write_generic(rows, datetime.utcnow())
+    db.session.commit()
+
+    assert product_ids[:2] == [products[0].id, 500]
+    assert db.session.get(Product, products[0].id).stock_quantity == 3
+    assert db.session.get(Product, 500).name == 'Feed Id'
+    assert db.session.get(Product, product_ids[2]).name == 'New Shirt'
+    assert Product.query.count() == len(products) + 2
+
+def test_batch_size_is_capped(monkeypatch):
+    batches = []
+
+    def write_batch(rows):
+        batches.append(len(rows))
+        return len(rows)
+
+    monkeypatch.setattr(catalog_import, 'MAX_BATCH_SIZE', 3)
+    monkeypatch.setattr(catalog_import, 'write_batch', write_batch)
+
+    report = import_products(enumerate([record(name=f'Shirt {i}') for i in range(7)], start=2), 10000000)
+
+    assert report.imported == 7
+    assert batches == [3, 3, 1]
@@ -0,0 +1,96 @@
+import pytest
+from models import db, CartItem, CheckoutJob, Order, Product
+import checkout_queue
+from checkout import cart_snapshot, enqueue_checkout
+from checkout_queue import process_batch
+
+SHIPPING = {
+    'shipping_address': '1 Test Street',
+    'shipping_city': 'Colombo',
+    'shipping_state': 'Western',
+    'shipping_zip': '00100',
+    'shipping_country': 'Sri Lanka'
+}
+
+@pytest.fixture
+def async_checkout(app):
+    app.config['CHECKOUT_ASYNC'] = True
+    yield
+    app.config['CHECKOUT_ASYNC'] = False
+
+def fill_cart(user, lines):
+    db.session.add_all(CartItem(user_id=user.id, product_id=product.id, quantity=quantity) for product, quantity in lines)
+    db.session.commit()
+
+def test_async_query_parameter_is_ignored(client, auth_headers, user, products):
+    fill_cart(user, [(products[0], 1)])
+
+    response = client.post('/api/checkout?async=true', json=SHIPPING, headers=auth_headers)
+    assert response.status_code == 201
+    assert CheckoutJob.query.count() == 0
+
+def test_queued_checkout_places_the_submitted_cart(client, auth_headers, user, products, async_checkout):
+    fill_cart(user, [(products[0], 2), (products[1], 1)])
+
+    response = client.post('/api/checkout', json=SHIPPING, headers=auth_headers)
+    assert response.status_code == 202
+    order_number = response.get_json()['order_number']
+
+    # The cart changes before the worker gets to the job
+    CartItem.query.filter_by(product_id=products[0].id).update({'quantity': 5})
+    fill_cart(user, [(products[2], 1)])
+
+    assert process_batch(10) == 1
+
+    order = Order.query.filter_by(order_number=order_number).one()
+    assert sorted((item.product_id, item.quantity) for item in order.order_items) == [
+        (products[0].id, 2), (products[1].id, 1)
+    ]
+    assert db.session.get(Product, products[0].id).stock_quantity == 8
+
+    # Lines added after submitting stay in the cart
+    assert [item.product_id for item in CartItem.query.all()] == [products[2].id]
+
+def test_queued_checkout_with_empty_cart(client, auth_headers, user, async_checkout):
+    response = client.post('/api/checkout', json=SHIPPING, headers=auth_headers)
+    assert response.status_code == 400
+    assert CheckoutJob.query.count() == 0
+
+def test_double_submit_queues_one_checkout(client, auth_headers, user, products, async_checkout):
+    fill_cart(user, [(products[0], 2)])
+
+    first = client.post('/api/checkout', json=SHIPPING, headers=auth_headers)
+    second = client.post('/api/checkout', json=SHIPPING, headers=auth_headers)
+    assert first.status_code == second.status_code == 202
+    assert first.get_json()['order_number'] == second.get_json()['order_number']
+
+    assert process_batch(10) == 1
+    assert Order.query.count() == 1
+    assert db.session.get(Product, products[0].id).stock_quantity == 8
+
+def test_second_job_for_the_same_cart_fails(user, products):
+    # Two jobs that got past the enqueue check: only the first gets the lines
+    fill_cart(user, [(products[0], 2)])
+    items = cart_snapshot(user.id)
+    first = enqueue_checkout(user.id, SHIPPING, items)
+    second = enqueue_checkout(user.id, SHIPPING, items)
+
+    assert process_batch(10) == 2
+    assert Order.query.count() == 1
+    assert db.session.get(Product, products[0].id).stock_quantity == 8
+    assert db.session.get(CheckoutJob, first.id).status == 'completed'
+    assert db.session.get(CheckoutJob, second.id).status == 'failed'
+    assert db.session.get(CheckoutJob, second.id).error == 'Cart is empty'
+
+def test_cleanup_failure_keeps_the_job_completed(user, products, monkeypatch):
+    def unavailable(*product_ids):
+        raise ConnectionError('cache unavailable')
+
+    monkeypatch.setattr(checkout_queue, 'invalidate_products', unavailable)
+    fill_cart(user, [(products[0], 1)])
+    job = enqueue_checkout(user.id, SHIPPING, cart_snapshot(user.id))
+
+    assert process_batch(10) == 1
+    job = db.session.get(CheckoutJob, job.id)
+    assert job.status == 'completed'
+    assert job.order_id == Order.query.one().id
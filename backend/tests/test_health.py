@@ -0,0 +1,19 @@
+from sqlalchemy.exc import OperationalError
+from models import db
+
+def test_database_health(client):
+    response = client.get('/api/health/db')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'healthy'
+
+def test_database_health_failure_hides_details(client, monkeypatch, caplog):
+    def fail(*args, **kwargs):
+        raise OperationalError('SELECT 1', {}, Exception('connection to postgresql://admin:secret@db failed'))
+
+    monkeypatch.setattr(db.session, 'execute', fail)
+    response = client.get('/api/health/db')
+
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'unhealthy'
+    assert 'secret' not in response.get_data(as_text=True)
+    assert 'secret' in caplog.text
@@ -0,0 +1,17 @@
+from prometheus_client import REGISTRY
+
+def requests_served(status):
+    value = REGISTRY.get_sample_value('http_requests_total', {
+        'method': 'GET', 'endpoint': 'products.get_product', 'status': status
+    })
+    return value or 0
+
+def test_not_modified_is_counted_as_304(client, products):
+    url = f'/api/products/{products[0].id}'
+    before = requests_served('200'), requests_served('304')
+
+    etag = client.get(url).headers['ETag']
+    for _ in range(2):
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    assert (requests_served('200'), requests_served('304')) == (before[0] + 1, before[1] + 2)
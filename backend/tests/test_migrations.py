@@ -0,0 +1,42 @@
+import os
+import pytest
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+from models import db, CheckoutJob
+from search import drop_sqlite_fts
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+@pytest.fixture
+def alembic_version():
+    yield
+    db.session.execute(db.text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+def test_upgrade_adds_checkout_jobs(alembic_version):
+    # A database created before async checkout existed
+    CheckoutJob.__table__.drop(db.engine)
+
+    upgrade(directory=MIGRATIONS)
+
+    inspector = inspect(db.engine)
+    assert 'checkout_jobs' in inspector.get_table_names()
+    assert {index['name'] for index in inspector.get_indexes('checkout_jobs')} == {
+        'ix_checkout_jobs_order_number', 'ix_checkout_jobs_status_id'
+    }
+
+def test_upgrade_over_create_all_is_a_no_op(alembic_version):
+    upgrade(directory=MIGRATIONS)
+
+    assert db.session.execute(db.text('SELECT version_num FROM alembic_version')).scalar() == 'a47e0b9c2d15'
+
+def test_upgrade_adds_search_index(alembic_version, client, products):
+    # A database created before full-text search existed
+    db.session.execute(drop_sqlite_fts)
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS)
+
+    response = client.get('/api/products', query_string={'search': products[0].name})
+    assert response.status_code == 200
+    assert products[0].id in [product['id'] for product in response.get_json()['products']]
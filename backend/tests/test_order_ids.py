@@ -0,0 +1,149 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, update
+import order_ids
+from models import OrderIdLease
+from order_ids import (
+    OrderIdGenerator, SLOTS_PER_HOST, STANDALONE_SLOT, MAX_WORKERS,
+    free_slot, parse, worker_id_for, lease_worker_id, renew_lease, release_lease
+)
+
+@pytest.fixture
+def instance_base(monkeypatch):
+    monkeypatch.setenv('ORDER_ID_WORKER_ID', '128')
+
+def test_every_slot_gets_its_own_worker_id(instance_base):
+    worker_ids = [worker_id_for(slot) for slot in range(SLOTS_PER_HOST)]
+    assert worker_ids == list(range(128, 128 + SLOTS_PER_HOST))
+
+def test_slots_never_wrap(instance_base):
+    # Slot 64 used to wrap onto slot 0's worker id and repeat its numbers
+    with pytest.raises(ValueError):
+        worker_id_for(SLOTS_PER_HOST)
+    with pytest.raises(ValueError):
+        worker_id_for(-1)
+
+def test_numbers_are_unique_across_slots(instance_base):
+    numbers = []
+    lock = threading.Lock()
+
+    def generate(slot):
+        generator = OrderIdGenerator(worker_id_for(slot))
+        batch = [generator.next() for _ in range(2000)]
+        assert batch == sorted(batch)
+        with lock:
+            numbers.extend(batch)
+
+    threads = [threading.Thread(target=generate, args=(slot,)) for slot in range(SLOTS_PER_HOST)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(numbers)) == len(numbers) == SLOTS_PER_HOST * 2000
+    assert {parse(number)[1] for number in numbers} == set(range(128, 128 + SLOTS_PER_HOST))
+
+def test_free_slots_cover_a_reload():
+    # A reload starts MAX_WORKERS new workers before the old ones exit
+    taken = set()
+    for _ in range(MAX_WORKERS * 2):
+        taken.add(free_slot(taken))
+
+    assert len(taken) == MAX_WORKERS * 2
+    assert STANDALONE_SLOT not in taken
+
+def test_running_out_of_slots_is_an_error():
+    with pytest.raises(RuntimeError):
+        free_slot(set(range(STANDALONE_SLOT)))
+
+def test_base_is_required_outside_debug_and_testing(monkeypatch):
+    monkeypatch.delenv('ORDER_ID_WORKER_ID', raising=False)
+    with pytest.raises(RuntimeError):
+        worker_id_for(0)
+    assert worker_id_for(0, required=False) % SLOTS_PER_HOST == 0
+
+@pytest.mark.parametrize('value', ['100', '-64', '1024'])
+def test_base_must_be_a_multiple_of_the_slot_count(monkeypatch, value):
+    monkeypatch.setenv('ORDER_ID_WORKER_ID', value)
+    with pytest.raises(ValueError):
+        worker_id_for(0)
+
+def test_generate_outside_gunicorn_in_testing(app, monkeypatch):
+    monkeypatch.delenv('ORDER_ID_WORKER_ID', raising=False)
+    monkeypatch.setattr(order_ids, '_generator', None)
+
+    number = order_ids.generate_order_number()
+    assert parse(number)[1] % SLOTS_PER_HOST == STANDALONE_SLOT
+
+@pytest.fixture
+def lease_engine(tmp_path, monkeypatch):
+    engine = create_engine(f'sqlite:///{tmp_path / "leases.db"}')
+    OrderIdLease.__table__.create(engine)
+    monkeypatch.setattr(order_ids, '_generator', None)
+    yield engine
+    order_ids.stop_lease()
+    engine.dispose()
+
+def expire(engine, worker_id):
+    with engine.begin() as connection:
+        connection.execute(
+            update(OrderIdLease.__table__)
+            .where(OrderIdLease.__table__.c.worker_id == worker_id)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+def test_leases_hand_out_distinct_worker_ids(lease_engine):
+    # Two instances sharing one environment
+    assert lease_worker_id(lease_engine, 'a:1') == 0
+    assert lease_worker_id(lease_engine, 'b:1') == 1
+
+    release_lease(lease_engine, 0, 'a:1')
+    assert lease_worker_id(lease_engine, 'c:1') == 0
+
+def test_concurrent_leases_do_not_collide(lease_engine):
+    worker_ids = []
+    lock = threading.Lock()
+
+    def lease(holder):
+        worker_id = lease_worker_id(lease_engine, holder)
+        with lock:
+            worker_ids.append(worker_id)
+
+    threads = [threading.Thread(target=lease, args=(f'host:{i}',)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(worker_ids) == list(range(8))
+
+def test_expired_lease_is_taken_over(lease_engine):
+    assert lease_worker_id(lease_engine, 'a:1') == 0
+    assert renew_lease(lease_engine, 0, 'a:1')
+
+    expire(lease_engine, 0)
+    assert lease_worker_id(lease_engine, 'b:1') == 0
+    assert not renew_lease(lease_engine, 0, 'a:1')
+
+def test_lost_lease_is_replaced(lease_engine):
+    worker_id = order_ids.start_lease(lease_engine)
+    expire(lease_engine, worker_id)
+    lease_worker_id(lease_engine, 'other:1')
+
+    order_ids._lease.renew()
+
+    assert order_ids._lease.worker_id != worker_id
+    assert parse(order_ids.generate_order_number())[1] == order_ids._lease.worker_id
+
+def test_stale_lease_stops_order_numbers(lease_engine):
+    worker_id = order_ids.start_lease(lease_engine)
+    assert parse(order_ids.generate_order_number())[1] == worker_id
+
+    # The renewal thread has not succeeded for a whole lease
+    order_ids._lease.valid_until = 0
+    with pytest.raises(RuntimeError, match='lease expired'):
+        order_ids.generate_order_number()
+
+    order_ids.stop_lease()
+    assert lease_worker_id(lease_engine, 'next:1') == worker_id
@@ -0,0 +1,88 @@
+import pytest
+from models import db, CartItem, Order, OrderItem
+from cache import cache
+from testing import query_budget, QueryBudgetExceeded
+
+# Statement budgets for hot endpoints; an N+1 or an extra round trip in one
+# of these views fails here before it shows up in production.
+
+@pytest.fixture(autouse=True)
+def uncached():
+    # Budgets apply to the uncached path
+    enabled, cache.enabled = cache.enabled, False
+    yield
+    cache.enabled = enabled
+
+def test_product_list(client, products):
+    with query_budget(2):
+        response = client.get('/api/products?per_page=30')
+    assert response.status_code == 200
+    assert len(response.get_json()['products']) == 30
+
+def test_product_list_with_cursor_and_facets(client, products):
+    with query_budget(2):
+        response = client.get('/api/products?cursor=&facets=true')
+    assert response.status_code == 200
+    assert response.get_json()['next_cursor']
+
+def test_cart(client, auth_headers, user, products):
+    db.session.add_all(CartItem(user_id=user.id, product_id=product.id, quantity=1) for product in products[:10])
+    db.session.commit()
+
+    with query_budget(1):
+        response = client.get('/api/cart', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['cart_items']) == 10
+
+def add_orders(user, products, count):
+    for i in range(count):
+        order = Order(user_id=user.id, order_number=f'DM-TEST-{i}', total_amount=30)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all(
+            OrderItem(order_id=order.id, product_id=product.id, product_name=product.name,
+                      product_price=product.price, quantity=1)
+            for product in products[i:i + 3]
+        )
+    db.session.commit()
+
+def test_order_history(client, auth_headers, user, products):
+    add_orders(user, products, 10)
+
+    with query_budget(2):
+        response = client.get('/api/orders', headers=auth_headers)
+    assert response.status_code == 200
+    assert [order['item_count'] for order in response.get_json()['orders']] == [3] * 10
+
+def test_admin_order_listing(client, user, products):
+    add_orders(user, products, 10)
+
+    # Count, page and one selectinload for every order's items
+    with query_budget(3):
+        response = client.get('/api/admin/orders?per_page=10')
+    assert response.status_code == 200
+    assert [len(order['order_items']) for order in response.get_json()['orders']] == [3] * 10
+
+def test_admin_order_listing_with_cursor(client, user, products):
+    add_orders(user, products, 10)
+
+    with query_budget(2):
+        response = client.get('/api/admin/orders?cursor=&per_page=5&fields=id,order_number,order_items')
+    assert response.status_code == 200
+    assert [len(order['order_items']) for order in response.get_json()['orders']] == [3] * 5
+
+def test_order_detail(client, auth_headers, user, products):
+    add_orders(user, products, 1)
+
+    with query_budget(2):
+        response = client.get('/api/orders/1', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['order']['order_items']) == 3
+
+def test_query_budget_reports_statements(app):
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        with query_budget(1):
+            db.session.execute(db.text('SELECT 1'))
+            db.session.execute(db.text('SELECT 2'))
+    assert '2 queries executed, budget was 1' in str(excinfo.value)
+    assert 'SELECT 2' in str(excinfo.value)
@@ -0,0 +1,29 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from cache import cache
+from models import db
+from testing import QueryCounter
+from benchmarks.query_plans import SCENARIOS, seed, full_scans
+
+# Every SELECT issued by a hot endpoint must use an index (see
+# benchmarks/query_plans.py for the verbose, printable version)
+
+@pytest.fixture
+def seeded(app):
+    enabled, cache.enabled = cache.enabled, False  # every request must reach the database
+    user_id = seed()
+    yield {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+    cache.enabled = enabled
+
+@pytest.mark.parametrize('path,authenticated', SCENARIOS)
+def test_no_full_table_scans(client, seeded, path, authenticated):
+    with QueryCounter() as counter:
+        response = client.get(path, headers=seeded if authenticated else None)
+        response.get_data()
+    assert response.status_code == 200
+
+    with db.engine.connect() as connection:
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            if statement.lstrip().upper().startswith('SELECT'):
+                scans, details = full_scans(connection, statement, parameters)
+                assert not scans, f'full scan of {", ".join(sorted(scans))}: {statement}\n' + '\n'.join(details)
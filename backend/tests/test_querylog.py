@@ -0,0 +1,36 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from config import config, TestingConfig
+from models import db
+
+class InstrumentedConfig(TestingConfig):
+    SQL_INSTRUMENTATION = True
+    QUERY_LOG_ENABLED = True
+
+@pytest.fixture
+def instrumented_app(monkeypatch):
+    monkeypatch.setitem(config, 'instrumented', InstrumentedConfig)
+    app = create_app('instrumented')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+def test_report_not_served_by_default(client):
+    assert client.get('/api/debug/queries').status_code == 404
+    assert client.delete('/api/debug/queries').status_code == 404
+
+def test_report_requires_a_token(instrumented_app):
+    client = instrumented_app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="1")}'}
+
+    assert client.get('/api/debug/queries').status_code == 401
+    assert client.delete('/api/debug/queries').status_code == 401
+
+    client.delete('/api/debug/queries', headers=headers)
+    client.get('/api/products')
+    response = client.get('/api/debug/queries', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['endpoints']['products.get_products']['requests'] == 1
@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine, insert
+from app import create_app
+from cache import cache
+from config import config, TestingConfig
+from models import db, Product, User
+from replicas import ReplicaSet, replicas
+
+class FakeEngine:
+    # Stands in for a replica engine; connect() blocks until released
+    def __init__(self, blocking=False):
+        self.probes = 0
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+
+    @contextmanager
+    def connect(self):
+        self.probes += 1
+        self.release.wait(5)
+        yield self
+
+    def execute(self, statement):
+        pass
+
+def test_slow_probe_does_not_block_other_readers():
+    slow, fast = FakeEngine(blocking=True), FakeEngine()
+    replica_set = ReplicaSet()
+    replica_set.engines = [slow, fast]
+
+    chosen = []
+    prober = threading.Thread(target=lambda: chosen.append(replica_set.choose()))
+    prober.start()
+    while not slow.probes:
+        time.sleep(0.001)
+
+    # While the first thread is stuck probing, the next reader is served
+    # (the slow replica's cached state is reused rather than waited on)
+    done = threading.Event()
+    threading.Thread(target=lambda: (chosen.append(replica_set.choose()), done.set())).start()
+    assert done.wait(1)
+
+    slow.release.set()
+    prober.join()
+    assert slow.probes == 1
+    assert len(chosen) == 2
+
+def test_probe_results_are_cached():
+    engine = FakeEngine()
+    replica_set = ReplicaSet()
+    replica_set.engines = [engine]
+
+    for _ in range(20):
+        assert replica_set.choose() is engine
+    assert engine.probes == 1
+
+@pytest.fixture
+def replicated_app(tmp_path, monkeypatch):
+    # A primary and two replicas in separate SQLite files; replica n holds
+    # n + 2 products named R<n>-<i>, the primary one product
+    urls = [f'sqlite:///{tmp_path / f"replica{n}.db"}' for n in range(2)]
+    for n, url in enumerate(urls):
+        engine = create_engine(url)
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(Product.__table__), [
+                {'name': f'R{n}-{i}', 'price': 10, 'category': 'Shirts', 'stock_quantity': 5, 'is_active': True}
+                for i in range(n + 2)
+            ])
+        engine.dispose()
+
+    class ReplicatedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "primary.db"}'
+        DATABASE_REPLICA_URLS = urls
+
+    monkeypatch.setitem(config, 'replicated', ReplicatedConfig)
+    app = create_app('replicated')
+    monkeypatch.setattr(cache, 'enabled', False)
+    with app.app_context():
+        db.create_all()
+        user = User(email='writer@example.com', first_name='Test', last_name='Writer', password_hash='!')
+        product = Product(name='Primary', price=10, category='Shirts', stock_quantity=5)
+        db.session.add_all([user, product])
+        db.session.commit()
+        app.config['headers'] = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+        app.config['product_id'] = product.id
+        db.session.remove()
+
+    # Outside this app's context, so each request gets its own g
+    yield app
+
+    for engine in replicas.engines:
+        engine.dispose()
+    replicas.engines = []
+
+def test_a_request_reads_from_one_replica(replicated_app):
+    client = replicated_app.test_client()
+
+    seen = set()
+    for _ in range(4):
+        body = client.get('/api/products?per_page=1').get_json()
+        replica = body['products'][0]['name'].split('-')[0]
+        # The page and its count come from the same replica
+        assert body['total'] == {'R0': 2, 'R1': 3}[replica]
+        seen.add(replica)
+
+    assert seen == {'R0', 'R1'}
+
+def test_writers_read_their_writes_from_the_primary(replicated_app):
+    client = replicated_app.test_client()
+    headers = replicated_app.config['headers']
+    product_id = replicated_app.config['product_id']
+
+    assert client.get('/api/cart', headers=headers).get_json()['cart_items'] == []
+    assert client.post('/api/cart', json={'product_id': product_id, 'quantity': 1}, headers=headers).status_code == 200
+
+    items = client.get('/api/cart', headers=headers).get_json()['cart_items']
+    assert [item['product_id'] for item in items] == [product_id]
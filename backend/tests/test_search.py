@@ -0,0 +1,21 @@
+def search(client, term):
+    response = client.get('/api/products', query_string={'search': term})
+    assert response.status_code == 200
+    return [product['id'] for product in response.get_json()['products']]
+
+def test_product_writes_keep_the_index_in_sync(client):
+    response = client.post('/api/admin/products', json={
+        'name': 'Waxed Canvas Parka', 'description': 'Windproof shell', 'price': 120, 'category': 'Jackets'
+    })
+    assert response.status_code == 201
+    product_id = response.get_json()['product']['id']
+
+    assert search(client, 'parka') == [product_id]
+    assert search(client, 'windproof') == [product_id]
+
+    response = client.put(f'/api/admin/products/{product_id}', json={'name': 'Quilted Anorak'})
+    assert response.status_code == 200
+
+    assert search(client, 'parka') == []
+    assert search(client, 'anorak') == [product_id]
+    assert search(client, 'windproof') == [product_id]
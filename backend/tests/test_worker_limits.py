@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import pytest
+import dbpool
+import passwords
+
+def share(workers):
+    passwords.share_across_workers(workers)
+    yield
+    passwords.discard_slots()
+
+@pytest.fixture
+def shared_limit():
+    yield from share(2)
+
+@pytest.fixture
+def single_slot():
+    yield from share(1)
+
+def test_shared_limit_caps_concurrent_hashing(shared_limit):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_hash(*args):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    threads = [threading.Thread(target=passwords._run, args=(fake_hash,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(peak) == 8
+    assert max(peak) == 2
+    assert passwords._executor is None
+
+def test_shared_limit_hashes_inline(shared_limit):
+    password_hash = passwords.hash_password('correct horse')
+    assert passwords.check_password(password_hash, 'correct horse')
+    assert passwords._executor is None
+
+def hold_slot(ready):
+    passwords._acquire_slot(1)
+    ready.set()
+    time.sleep(60)
+
+def test_killed_worker_frees_its_slot(single_slot):
+    context = multiprocessing.get_context('fork')
+    ready = context.Event()
+    holder = context.Process(target=hold_slot, args=(ready,))
+    holder.start()
+    assert ready.wait(5)
+
+    with pytest.raises(passwords.HashingBusy):
+        passwords._acquire_slot(0.05)
+
+    os.kill(holder.pid, signal.SIGKILL)
+    holder.join()
+    os.close(passwords._acquire_slot(1))
+
+def test_busy_hashing_answers_503(app, client, user, single_slot, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    descriptor = passwords._acquire_slot(1)
+    try:
+        response = client.post('/api/auth/login', json={'email': user.email, 'password': 'secret'})
+    finally:
+        os.close(descriptor)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def test_connection_budget(app):
+    config = {**app.config, 'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 10, 'DB_MAX_CONNECTIONS': 100}
+
+    assert dbpool.check_connection_budget(config, None, 6) == (90, 100)
+    with pytest.raises(RuntimeError, match='= 105, more than the 100 available'):
+        dbpool.check_connection_budget(config, None, 7)
+
+def test_default_pool_fits_the_default_workers(app):
+    # 2 x 4 CPUs + 1 gthread workers with 4 threads against PostgreSQL's
+    # default 100 - 3 reserved connections
+    pool_size, max_overflow = dbpool.pool_size_for(4)
+    assert (pool_size, max_overflow) == (4, 0)
+
+    config = {**app.config, 'DB_POOL_SIZE': pool_size, 'DB_MAX_OVERFLOW': max_overflow, 'DB_MAX_CONNECTIONS': 97}
+    assert dbpool.check_connection_budget(config, None, 9, 4) == (36, 97)
+
+def test_budget_counts_one_connection_per_concurrent_request(app):
+    config = {**app.config, 'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 10, 'DB_MAX_CONNECTIONS': 97}
+    assert dbpool.check_connection_budget(config, None, 9, 4) == (36, 97)
+    assert dbpool.pool_size_for(100) == (5, 10)
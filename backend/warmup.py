@@ -0,0 +1,50 @@
+import logging
+import time
+from sqlalchemy import text
+from models import db
+from replicas import replicas
+
+# Worker warmup (gunicorn post_worker_init): open database connections and
+# fill the caches for the busiest pages before the worker accepts its first
+# request, so a deploy does not start cold.
+
+logger = logging.getLogger(__name__)
+
+def prime_connections(engine, count):
+    # Hold `count` connections at once so the pool opens them all now
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connection.execute(text('SELECT 1'))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+
+def prime_caches(app):
+    client = app.test_client()
+    for path in app.config['WARMUP_PATHS']:
+        response = client.get(path)
+        if response.status_code >= 400:
+            logger.warning('Warmup request %s returned %s', path, response.status_code)
+
+def warm_up(app, connections=1):
+    if not app.config.get('WARMUP_ENABLED', True):
+        return
+
+    start = time.perf_counter()
+    try:
+        with app.app_context():
+            count = min(connections, app.config['DB_POOL_SIZE'])
+            prime_connections(db.engine, count)
+            for engine in replicas.engines:
+                prime_connections(engine, count)
+
+        prime_caches(app)
+    except Exception:
+        # A cold worker is better than no worker
+        logger.exception('Worker warmup failed')
+        return
+
+    logger.info('Worker warmed up in %.0fms', (time.perf_counter() - start) * 1000)